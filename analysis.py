@@ -0,0 +1,167 @@
+import sys
+import time
+import string
+from collections import Counter
+from itertools import repeat
+
+# Define stop words
+STOP_WORDS = {"the", "is", "in", "at", "of", "and", "a", "to", "for", "on", "it", "an", "with", "as", "by", "that", "this"}
+
+
+def normalize(words):
+    """
+    word.strip(string.punctuation).lower() for each of words, mapped in C rather than a Python
+    loop. All-punctuation words give "".
+    """
+    return map(str.lower, map(str.strip, words, repeat(string.punctuation)))
+
+
+# Function to check if a word is likely a noun (basic heuristic), used by Assignment1/Assignment1b
+def is_noun(word):
+    # Exclude stop words
+    if not word or word in STOP_WORDS:
+        return False
+    # Consider word as noun if it is alphabetic and starts with a capital letter (a basic heuristic)
+    return word[0].isupper() or word.isalpha()
+
+
+# Function to check if a word is valid (e.g., not a stop word), used by a2/ass2
+def is_valid_word(word):
+    return word and word not in STOP_WORDS and word.isalpha()
+
+
+# Analysis stages map a list of tokens to a new list (queries) and {term: frequency} to a new
+# dict (documents, where each distinct term is processed once). They are module-level classes
+# so analyzers can be sent to indexing worker processes.
+class Stage:
+    def counts(self, counts):
+        result = {}
+        for term, freq in counts.items():
+            for token in self([term]):
+                result[token] = result.get(token, 0) + freq
+        return result
+
+
+# Stages that only drop tokens; the analyzer runs them over the distinct terms
+class Filter(Stage):
+    def counts(self, counts):
+        return {term: counts[term] for term in self(list(counts))}
+
+
+class StopWords(Filter):
+    def __init__(self, words=STOP_WORDS):
+        self.words = frozenset(words)
+
+    def __call__(self, tokens):
+        return [token for token in tokens if token not in self.words]
+
+
+class Alphabetic(Filter):
+    def __call__(self, tokens):
+        return [token for token in tokens if token.isalpha()]
+
+
+# Assignment1's noun heuristic (see is_noun), stop words included
+class Nouns(Filter):
+    def __call__(self, tokens):
+        return [token for token in tokens if token not in STOP_WORDS and (token.isalpha() or token[0].isupper())]
+
+
+# Tokenizer plus stages; documents and queries go through the same analyzer
+class Analyzer:
+    def __init__(self, *stages, surface_counts=False):
+        """
+        surface_counts: the index also keeps, per term, the count of words that already were the
+        term (lowercase, no punctuation), which legacy TF-IDF scores by (see surface()).
+        """
+        self.stages = stages
+        self.surface_counts = surface_counts
+
+    def terms(self, text):
+        """
+        The terms of a query (or any text) in order, repeats kept.
+        """
+        tokens = [token for token in normalize(text.split()) if token]
+        for stage in self.stages:
+            tokens = stage(tokens)
+        return tokens
+
+    def __call__(self, content):
+        """
+        Index-time analysis: (token count, {term: frequency}), terms in order of first occurrence.
+        """
+        words = content.split()
+        surface = Counter(words)  # Each distinct word as written, counted in C
+
+        # Normalize each distinct word once instead of every occurrence
+        normalized = list(normalize(surface))
+        counts = dict(zip(normalized, surface.values()))
+        if len(counts) < len(normalized):  # Several written forms of one term, e.g. "Stack" and "stack,"
+            counts = {}
+            for term, freq in zip(normalized, surface.values()):
+                counts[term] = counts.get(term, 0) + freq
+        counts.pop("", None)
+        terms = list(counts)
+        for stage in self.stages:
+            if isinstance(stage, Filter):
+                terms = stage(terms)  # Consecutive filters narrow one list of distinct terms
+            else:
+                counts = stage.counts({term: counts[term] for term in terms})
+                terms = list(counts)
+        return len(words), {term: counts[term] for term in terms}
+
+    def surface(self, content, terms):
+        """
+        {term: occurrences written exactly as the term} for the given terms of content, the count
+        content.split().count(term) gives.
+        """
+        surface = Counter(content.split())
+        return {term: surface[term] for term in terms}
+
+
+# The analyzers behind the indexes; they map document content to (token count, {term: frequency})
+noun_analyzer = Analyzer(Nouns())  # Assignment1/Assignment1b
+keyword_analyzer = Analyzer(StopWords(), Alphabetic(), surface_counts=True)  # a2/ass2
+term_analyzer = Analyzer()  # Every token (assignment4 to assignment7)
+word_analyzer = Analyzer(Alphabetic())  # Every alphabetic token (assignment3)
+
+ANALYZERS = {"noun": noun_analyzer, "keyword": keyword_analyzer, "term": term_analyzer, "word": word_analyzer}
+
+
+def benchmark(analyzer, texts, repeat=3):
+    """
+    Analyzer throughput over texts in MB/s of UTF-8 input, the best of repeat runs.
+    """
+    size = sum(len(text.encode("utf-8")) for text in texts)
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in texts:
+            analyzer(text)
+        best = min(best, time.perf_counter() - start)
+    return size / 1e6 / best if best else float("inf")
+
+
+# The per-word strip/lower loop the analyzers replaced, as a baseline for the benchmark
+def split_strip_analyzer(content):
+    words = content.split()
+    terms = {}
+    for word in words:
+        term = word.strip(string.punctuation).lower()
+        if term:
+            terms[term] = terms.get(term, 0) + 1
+    return len(words), terms
+
+
+# Usage: python analysis.py <documents folder> [repeat]
+def main(argv):
+    from corpus import iter_documents
+    texts = [doc["content"] for doc in iter_documents(argv[1])]
+    repeat = int(argv[2]) if len(argv) > 2 else 3
+    print(f"{len(texts)} documents, {sum(len(text.encode('utf-8')) for text in texts) / 1e6:.2f} MB")
+    for name, analyzer in [("split/strip baseline", split_strip_analyzer)] + list(ANALYZERS.items()):
+        print(f"{name:>22}: {benchmark(analyzer, texts, repeat):8.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -1,62 +1,19 @@
 import streamlit as st
-import os
-import string
-from collections import defaultdict
-import networkx as nx
+from search_client import cache_summary, connect
 
 
-class InvertedIndexer:
-    def __init__(self):
-        self.index = defaultdict(set)
+# Retrieval model -> search model
+SEARCH_MODELS = {
+    "Probabilistic (Binary Independence Model)": "bim",
+    "Non-Overlapped List Model": "non_overlapped",
+    "Proximal Nodes Model": "proximal",
+}
 
-    def add(self, term, doc_id):
-        self.index[term].add(doc_id)
 
-    def search(self, term):
-        return self.index.get(term, set())
-
-
-def is_valid_word(word):
-    return word.isalpha()  # Checks if the word consists of alphabetic characters
-
-
-def build_proximal_graph(documents):
-    graph = nx.Graph()
-    for doc in documents:
-        title = doc['title']
-        graph.add_node(title, path=doc['path'])
-        words = set(doc['content'].split())
-        for word in words:
-            graph.add_edge(title, word)
-    return graph
-
-
-def gather_documents_and_create_index(base_path):
-    documents = []
-    title_index = InvertedIndexer()
-    content_index = InvertedIndexer()
-
-    for foldername in os.listdir(base_path):
-        folder_path = os.path.join(base_path, foldername)
-        if os.path.isdir(folder_path):
-            for filename in os.listdir(folder_path):
-                file_path = os.path.join(folder_path, filename)
-                with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-                    content = f.read()
-
-                documents.append({
-                    "title": filename,
-                    "path": file_path,
-                    "content": content
-                })
-
-                title_index.add(filename.strip(string.punctuation).lower(), file_path)
-                for word in content.split():
-                    word = word.strip(string.punctuation).lower()
-                    if is_valid_word(word):
-                        content_index.add(word, file_path)
-
-    return documents, title_index, content_index, build_proximal_graph(documents)
+# Searches go to the search server at $SEARCH_SERVER_URL, or run in this process when it is unset
+@st.cache_resource
+def get_search_client(base_path):
+    return connect(base_path)
 
 
 # Streamlit App
@@ -65,69 +22,56 @@ BASE_PATH = "C:\\IR\\DataStructures"  # Replace with your documents folder path
 st.title("Document Retrieval System")
 st.sidebar.header("Select Retrieval Model")
 
-# Load documents and create indexes
-st.write("Loading documents...")
-documents, title_index, content_index, proximal_graph = gather_documents_and_create_index(BASE_PATH)
-st.success("Documents loaded successfully!")
+client = get_search_client(BASE_PATH)
 
 # Model Selection
 model = st.sidebar.selectbox(
     "Choose a retrieval model",
-    ["Probabilistic (Binary Independence Model)", "Non-Overlapped List Model", "Proximal Nodes Model"]
+    list(SEARCH_MODELS)
 )
 
 # User Query Input
 query = st.text_input("Enter your search query:")
+top_k = st.number_input("Number of results", min_value=1, value=10)
 
 if st.button("Search"):
     if model == "Probabilistic (Binary Independence Model)":
         st.subheader("Probabilistic Retrieval Results")
-        query_terms = query.strip().lower().split()
-        document_scores = defaultdict(int)
-
-        # Calculate scores for all documents
-        all_docs = {doc['path']: 0 for doc in documents}  # Initialize all documents with a score of 0
-
-        for term in query_terms:
-            relevant_docs = content_index.search(term)
-            for doc in relevant_docs:
-                all_docs[doc] += 1  # Increment score for relevant documents
-
-        # Sort documents by their scores
-        ranked_docs = sorted(all_docs.items(), key=lambda x: x[1], reverse=True)
+        ranked_docs = client.search("bim", query, int(top_k))["results"]
 
-        # Show scores for all documents
-        st.write("Scores for all documents:")
-        for doc, score in ranked_docs:
-            st.write(f"{doc} - Score: {score}")
+        # Show scores for the top documents
+        st.write("Scores for top documents:")
+        for result in ranked_docs:
+            st.write(f"{result['path']} - Score: {result['score']}")
 
     elif model == "Non-Overlapped List Model":
         st.subheader("Non-Overlapped List Results")
-        query_terms = query.strip().lower().split()
-        all_documents = set()
-
-        for term in query_terms:
-            all_documents |= content_index.search(term)  # Union of document sets
+        all_documents = client.search("non_overlapped", query)["results"]
 
         st.write("Relevant Documents:")
-        for doc in all_documents:
-            st.write(doc)
+        for result in all_documents:
+            st.write(result["path"])
 
     elif model == "Proximal Nodes Model":
         st.subheader("Proximal Nodes Results")
-        nodes_of_interest = query.strip().lower().split()
-        relevant_docs = set()
-
-        for node in nodes_of_interest:
-            if proximal_graph.has_node(node):
-                neighbors = proximal_graph.neighbors(node)
-                for neighbor in neighbors:
-                    if neighbor in proximal_graph.nodes:
-                        relevant_docs.add(proximal_graph.nodes[neighbor].get("path", neighbor))
+        st.caption('Use "quoted words" for a phrase and a NEAR/k b for words at most k tokens apart.')
+        relevant_docs, neighbors = client.search_batch([
+            {"model": "proximal", "query": query},
+            {"model": "neighbors", "query": query, "k": int(top_k)},
+        ])
 
         st.write("Documents connected to proximal nodes:")
-        for doc in relevant_docs:
-            st.write(doc)
+        for result in relevant_docs["results"]:
+            st.write(result["path"])
+
+        # One hop out through the doc-term graph: documents sharing the most terms with the results
+        if neighbors["results"]:
+            st.write("Neighboring documents:")
+            for result in neighbors["results"]:
+                st.write(f"{result['path']} - Shared terms: {result['score']}")
+
+# Cache hit/miss counters, for sizing the cache
+st.sidebar.caption(cache_summary(client, "words"))
 
 # Evaluate Model (Optional)
 if st.sidebar.checkbox("Show evaluation metrics"):
@@ -1,45 +1,16 @@
-import os
 import streamlit as st
+from hyperlinks import Hyperlinker, open_link_targets
+from index_service import open_term_service
 
-# Function to load documents and create the content hierarchy
-def load_documents(base_path):
-    """
-    Load documents from the specified base path and organize them into categories.
-    """
-    documents = {}
-    for folder_name in os.listdir(base_path):
-        folder_path = os.path.join(base_path, folder_name)
-        if os.path.isdir(folder_path):
-            documents[folder_name] = []
-            for file_name in os.listdir(folder_path):
-                file_path = os.path.join(folder_path, file_name)
-                with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-                    content = f.read()
-                documents[folder_name].append({
-                    "title": file_name,
-                    "content": content,
-                    "path": file_path
-                })
-    return documents
+# Link table of one index generation (salient term -> its best-ranked document), with its rendered pages
+@st.cache_resource(max_entries=2)
+def get_hyperlinker(generation, _content_index):
+    return Hyperlinker(open_link_targets(_content_index))
 
-# Function to process content and convert specific words to clickable elements
-def convert_to_hyperlinked_content(content, category):
-    """
-    Process the content to make specific words clickable to navigate within the same page.
-    """
-    words = content.split()
-    clickable_words = []
-    for word in words:
-        # Define words to make clickable and associate them with navigation actions
-        if word.lower() == "stack":
-            clickable_words.append(f'<a href="#" onclick="set_state(\'category\', \'{category}\', \'doc\', \'stack_intro.txt\')">{word}</a>')
-        elif word.lower() == "queue":
-            clickable_words.append(f'<a href="#" onclick="set_state(\'category\', \'{category}\', \'doc\', \'queue_intro.txt\')">{word}</a>')
-        elif word.lower() == "heap":
-            clickable_words.append(f'<a href="#" onclick="set_state(\'category\', \'{category}\', \'doc\', \'heap_intro.txt\')">{word}</a>')
-        else:
-            clickable_words.append(word)
-    return " ".join(clickable_words)
+# One read-only term index shared by every session and rerun (the one assignment5 and assignment7 also use)
+@st.cache_resource
+def get_index_service(base_path):
+    return open_term_service(base_path)
 
 # Streamlit UI Configuration
 st.set_page_config(layout="wide", page_title="Structure Guided Document Viewer")
@@ -47,7 +18,9 @@ st.sidebar.header("Documents")
 
 # Define the base folder path
 BASE_PATH = "C:\\IR\\DataStructures"  # Replace this with your documents folder path
-documents = load_documents(BASE_PATH)
+handle = get_index_service(BASE_PATH).handle()
+documents = handle.documents()
+hyperlinker = get_hyperlinker(handle.generation, handle.content_index)
 
 # Initialize session state for selected category and document
 if "selected_category" not in st.session_state:
@@ -55,6 +28,16 @@ if "selected_category" not in st.session_state:
 if "selected_document" not in st.session_state:
     st.session_state.selected_document = None
 
+# A followed link opens its target document (?doc=<path>)
+if "doc" in st.query_params:
+    linked_path = st.query_params["doc"]
+    del st.query_params["doc"]
+    for category, files in documents.items():
+        for doc in files:
+            if doc["path"] == linked_path:
+                st.session_state.selected_category = category
+                st.session_state.selected_document = doc
+
 # Sidebar with hierarchical structure
 st.sidebar.title("Structure Guided Browsing")
 
@@ -73,9 +56,8 @@ if st.session_state.selected_category and st.session_state.selected_document:
     selected_document = st.session_state.selected_document
 
     st.subheader(selected_document["title"])
-    # Convert content into clickable words
-    hyperlinked_content = convert_to_hyperlinked_content(selected_document["content"], selected_category)
-    st.markdown(hyperlinked_content, unsafe_allow_html=True)
+    # Salient terms link to the document that ranks best for them
+    st.markdown(hyperlinker.html(selected_document["path"]), unsafe_allow_html=True)
 
     # Display related documents as buttons
     st.markdown("### Related Documents")
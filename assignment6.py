@@ -1,67 +1,58 @@
 import streamlit as st
-import numpy as np
-from scipy.special import expit as sigmoid
 import speech_recognition as sr
+import io
 import os
+import time
+from speech import BACKENDS, OFFLINE_BACKENDS, BackgroundCapture, transcribe_file
+from search_client import cache_summary, connect
 
-def load_documents(base_path):
-    """
-    Load documents from the specified base path and organize them into categories.
-    """
-    documents = {}
-    for folder_name in os.listdir(base_path):
-        folder_path = os.path.join(base_path, folder_name)
-        if os.path.isdir(folder_path):
-            documents[folder_name] = []
-            for file_name in os.listdir(folder_path):
-                file_path = os.path.join(folder_path, file_name)
-                with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-                    content = f.read()
-                documents[folder_name].append({
-                    "title": file_name,
-                    "content": content,
-                    "path": file_path
-                })
-    return documents
-
-def compute_relevance_score(X1, X2):
-    # Neural network weights and biases
-    W_input1, W_input2 = 0.8, 0.6
-    B_input = 0.2
-    W_output = 1.5
-    B_output = -0.4
+# Seconds to wait for speech before giving up
+LISTEN_TIMEOUT = 5
 
-    # Hidden layer calculation
-    H_input = W_input1 * X1 + W_input2 * X2 + B_input
-    H = sigmoid(H_input)
+# Transcribe an uploaded WAV query once per file and backend
+@st.cache_data
+def transcribe_upload(data, backend):
+    return transcribe_file(io.BytesIO(data), backend)
 
-    # Output layer calculation
-    relevance_score = W_output * H + B_output
-    return relevance_score
-
-def preprocess_query(query):
-    # A very simple preprocessing example: splitting query into words
-    words = query.lower().split()
-    X1 = len([word for word in words if word in ["binary", "queue"]]) / len(words)
-    X2 = len([word for word in words if word in ["hashing", "stack", "binary"]]) / len(words)
-    return X1, X2
+def start_listening(backend):
+    capture = BackgroundCapture(backend)
+    try:
+        capture.start()
+    except (OSError, AttributeError) as e:  # No microphone, or PyAudio missing
+        st.error(f"Could not open the microphone; {e}")
+        return
+    st.session_state.capture = capture
 
 def speech_to_text():
-    recognizer = sr.Recognizer()
-    with sr.Microphone() as source:
-        st.info("Listening... Please speak your query.")
-        try:
-            audio = recognizer.listen(source, timeout=5)
-            query = recognizer.recognize_google(audio)
-            st.success(f"You said: {query}")
-            return query
-        except sr.WaitTimeoutError:
-            st.error("Listening timed out. Please try again.")
-        except sr.UnknownValueError:
-            st.error("Sorry, could not understand the audio. Please try again.")
-        except sr.RequestError as e:
-            st.error(f"Could not request results; {e}")
-    return None
+    """
+    Poll the background capture without blocking: show the partial transcript while listening and
+    return the final transcript as soon as there is one (None until then).
+    """
+    capture = st.session_state.get("capture")
+    if capture is None:
+        return None
+    if capture.error:
+        st.error(capture.error)
+    elif capture.final is not None:
+        st.success(f"You said: {capture.final}")
+    elif not capture.running:
+        st.error("Sorry, could not understand the audio. Please try again.")
+    elif not capture.partials and time.monotonic() - capture.started > LISTEN_TIMEOUT:
+        capture.stop()
+        st.error("Listening timed out. Please try again.")
+    else:
+        st.info(f"Listening... {capture.transcript}")
+        if st.button("Stop listening"):
+            capture.stop()
+        time.sleep(0.3)
+        st.rerun()
+    del st.session_state.capture
+    return capture.final
+
+# Searches go to the search server at $SEARCH_SERVER_URL, or run in this process when it is unset
+@st.cache_resource
+def get_search_client(base_path):
+    return connect(base_path)
 
 # Fixed path to the base directory
 BASE_PATH = "C:\\IR\\DataStructures"
@@ -71,34 +62,31 @@ st.title("Neural Network for Information Retrieval")
 st.header("Voice-Activated Query Processing")
 
 if os.path.exists(BASE_PATH):
-    documents = load_documents(BASE_PATH)
+    client = get_search_client(BASE_PATH)
     st.success("Documents loaded successfully!")
 else:
     st.error("Invalid path. Please check the BASE_PATH and try again.")
 
+backend = st.selectbox("Speech recognizer", list(BACKENDS), format_func=lambda name: f"{name} ({'offline' if name in OFFLINE_BACKENDS else 'online'})")
 query = st.text_input("Or type your query below:")
 if st.button("Use Speech Input"):
-    query = speech_to_text()
+    start_listening(backend)
+query = speech_to_text() or query
 
-if query and 'documents' in locals():
-    query_X1, query_X2 = preprocess_query(query)
-    results = []
+wav_query = st.file_uploader("Or upload a spoken query (WAV)", type=["wav"])
+if wav_query is not None:
+    try:
+        query = transcribe_upload(wav_query.getvalue(), backend) or query
+    except sr.RequestError as e:
+        st.error(f"Could not request results; {e}")
 
-    for category, docs in documents.items():
-        for doc in docs:
-            doc_X1, doc_X2 = preprocess_query(doc["content"])
-            score = compute_relevance_score(query_X1, query_X2)
-            results.append({
-                "title": doc["title"],
-                "category": category,
-                "score": score,
-                "path": doc["path"]
-            })
-
-    # Sort results by score
-    results = sorted(results, key=lambda x: x["score"], reverse=True)
+if query and 'client' in locals():
+    results = client.search("neural", query, 5)["results"]
 
     # Display top results
     st.write("Top Matching Documents:")
-    for result in results[:5]:
+    for result in results:
         st.write(f"Title: {result['title']}, Category: {result['category']}, Score: {result['score']:.3f}")
+
+    # Cache hit/miss counters, for sizing the cache
+    st.sidebar.caption(cache_summary(client, "terms"))
@@ -0,0 +1,88 @@
+import math
+import numpy as np
+
+
+# BM25 / BM25+ ranking over an InvertedIndexer, with postings held as NumPy arrays
+class BM25Index:
+    def __init__(self, indexer, k1=1.2, b=0.75, delta=0.0, num_live_docs=None, avg_doc_length=None):
+        """
+        delta=0 gives BM25; delta > 0 (typically 1.0) gives BM25+, which adds delta to the
+        term-frequency component of every document containing the term.
+
+        When indexer is one shard of a collection, num_live_docs and avg_doc_length give the
+        whole collection's statistics (and the methods below take its document frequencies).
+        """
+        self.indexer = indexer
+        self.k1 = k1
+        self.b = b
+        self.delta = delta
+        self.num_docs = len(indexer.docs)  # doc-ID slots, including deleted documents
+        self.num_live_docs = indexer.docs.live_count() if num_live_docs is None else num_live_docs
+        self.doc_lengths = np.frombuffer(indexer.doc_length_array(), dtype=np.uint32).astype(np.float64)
+        if avg_doc_length is None:
+            live_lengths = np.delete(self.doc_lengths, np.array(sorted(indexer.docs.deleted), dtype=np.int64))
+            avg_doc_length = live_lengths.mean() if len(live_lengths) else 0.0
+        self.avg_doc_length = avg_doc_length
+        self._postings = {}  # term -> (doc IDs, term frequencies), decoded once
+
+    def term_postings(self, term):
+        postings = self._postings.get(term)
+        if postings is None:
+            pairs = self.indexer.postings(term)
+            doc_ids = np.fromiter((doc_id for doc_id, _ in pairs), dtype=np.int64, count=len(pairs))
+            freqs = np.fromiter((freq for _, freq in pairs), dtype=np.float64, count=len(pairs))
+            keep = freqs > 0
+            postings = self._postings[term] = (doc_ids[keep], freqs[keep])
+        return postings
+
+    def doc_freq(self, term):
+        """
+        Number of live documents in which the term occurs (the document frequency IDF uses).
+        """
+        return len(self.term_postings(term)[0])
+
+    def idf(self, term, doc_freq=None):
+        doc_freq = self.doc_freq(term) if doc_freq is None else doc_freq
+        return math.log(1 + (self.num_live_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+
+    def term_scores(self, term, doc_freq=None):
+        """
+        Return (doc IDs, scores) of one term over its postings only, in doc-ID order.
+        """
+        ids, freqs = self.term_postings(term)
+        if not len(ids):
+            return ids, freqs
+        norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[ids] / self.avg_doc_length)
+        return ids, self.idf(term, doc_freq) * (freqs * (self.k1 + 1) / (freqs + norm) + self.delta)
+
+    def scores(self, query_terms, doc_freqs=None):
+        """
+        Return a dense array of BM25 scores indexed by doc ID; doc_freqs optionally gives
+        {term: document frequency} in the whole collection.
+        """
+        doc_ids = []
+        weights = []
+        for term in query_terms:
+            ids, term_scores = self.term_scores(term, doc_freqs[term] if doc_freqs is not None else None)
+            if not len(ids):
+                continue
+            weights.append(term_scores)
+            doc_ids.append(ids)
+        if not doc_ids:
+            return np.zeros(self.num_docs)
+        # One batched accumulation over the postings of every query term
+        return np.bincount(np.concatenate(doc_ids), weights=np.concatenate(weights), minlength=self.num_docs)
+
+    def top_k(self, query_terms, k, doc_freqs=None):
+        """
+        Return up to k (doc ID, score) pairs with positive score, best first (ties by doc ID).
+        """
+        scores = self.scores(query_terms, doc_freqs)
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+            # Keep every doc tied with the k-th score so the tie-break below is by doc ID
+            kth_score = scores[candidates].min()
+            candidates = np.flatnonzero(scores >= kth_score)
+        order = np.lexsort((candidates, -scores[candidates]))[:k]
+        return [(int(doc_id), float(scores[doc_id])) for doc_id in candidates[order]]
@@ -0,0 +1,250 @@
+import re
+from bisect import bisect_left
+
+# Operators, from loosest to tightest binding: OR, AND, NOT. Parentheses group.
+# Adjacent terms without an operator are OR'ed, as the old parser's default operator was;
+# "a not b" reads as "a and not b". Terms the analyzer drops (stop words) are left out of the tree,
+# as the old parser ignored them.
+OPERATORS = {"and", "or", "not"}
+
+TOKEN_PATTERN = re.compile(r"[()]|[^\s()]+")
+
+
+# Query tree nodes
+class Term:
+    def __init__(self, term):
+        self.term = term
+
+    def __repr__(self):
+        return f"Term({self.term!r})"
+
+
+class Not:
+    def __init__(self, child):
+        self.child = child
+
+    def __repr__(self):
+        return f"Not({self.child!r})"
+
+
+class And:
+    def __init__(self, children):
+        self.children = children
+
+    def __repr__(self):
+        return f"And({self.children!r})"
+
+
+class Or:
+    def __init__(self, children):
+        self.children = children
+
+    def __repr__(self):
+        return f"Or({self.children!r})"
+
+
+# Recursive-descent parser producing a query tree
+class QueryParser:
+    def __init__(self, query, analyzer=None):
+        self.tokens = TOKEN_PATTERN.findall(query.lower())
+        self.analyzer = analyzer  # When given, each term is analyzed as the index analyzed documents
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def next(self):
+        token = self.peek()
+        self.pos += 1
+        return token
+
+    def parse(self):
+        """
+        Return the query tree, or None for an empty query. Raises ValueError on malformed queries
+        and on queries whose every term the analyzer drops.
+        """
+        if not self.tokens:
+            return None
+        node = self.parse_or()
+        if self.peek() is not None:
+            raise ValueError(f"Unexpected '{self.peek()}' in query")
+        if node is None:
+            raise ValueError("Query has no searchable terms (stop words are ignored)")
+        return node
+
+    def parse_or(self):
+        children = [self.parse_and()]
+        while self.peek() not in (None, ")"):
+            if self.peek() == "or":
+                self.next()
+            children.append(self.parse_and())  # Juxtaposed operands are OR'ed
+        return combine(Or, children)
+
+    def parse_and(self):
+        children = [self.parse_not()]
+        while self.peek() in ("and", "not"):
+            if self.peek() == "and":
+                self.next()
+            children.append(self.parse_not())
+        return combine(And, children)
+
+    def parse_not(self):
+        if self.peek() == "not":
+            self.next()
+            child = self.parse_not()
+            return None if child is None else Not(child)
+        return self.parse_primary()
+
+    def parse_primary(self):
+        """
+        Return the node of a term or parenthesized group, or None when the analyzer drops all of it.
+        """
+        token = self.next()
+        if token is None:
+            raise ValueError("Query ends with an operator")
+        if token == "(":
+            node = self.parse_or()
+            if self.next() != ")":
+                raise ValueError("Missing ')' in query")
+            return node
+        if token == ")" or token in OPERATORS:
+            raise ValueError(f"Unexpected '{token}' in query")
+        terms = self.analyzer.terms(token) if self.analyzer is not None else [token]
+        return combine(And, [Term(term) for term in terms])
+
+
+def combine(node_type, children):
+    """
+    Join the children that were not dropped (None) under node_type; None when all were dropped.
+    """
+    children = [child for child in children if child is not None]
+    if len(children) > 1:
+        return node_type(children)
+    return children[0] if children else None
+
+
+def parse_query(query, analyzer=None):
+    return QueryParser(query, analyzer).parse()
+
+
+def positive_terms(node):
+    """
+    Return the terms of a query tree that are not negated, in query order (the terms to rank by).
+    """
+    if node is None or isinstance(node, Not):
+        return []
+    if isinstance(node, Term):
+        return [node.term]
+    return [term for child in node.children for term in positive_terms(child)]
+
+
+# Sorted doc-ID list operations
+def gallop(doc_ids, target, lo=0):
+    """
+    Return the first position >= lo whose doc ID is >= target, probing 1, 2, 4, ... ahead before bisecting.
+    """
+    step = 1
+    hi = lo
+    while hi < len(doc_ids) and doc_ids[hi] < target:
+        lo = hi + 1
+        hi += step
+        step *= 2
+    return bisect_left(doc_ids, target, lo, min(hi, len(doc_ids)))
+
+
+def intersect(small, large):
+    if len(small) > len(large):
+        small, large = large, small
+    result = []
+    pos = 0
+    for doc_id in small:
+        pos = gallop(large, doc_id, pos)
+        if pos == len(large):
+            break
+        if large[pos] == doc_id:
+            result.append(doc_id)
+    return result
+
+
+def difference(base, removed):
+    result = []
+    pos = 0
+    for doc_id in base:
+        pos = gallop(removed, doc_id, pos)
+        if pos == len(removed) or removed[pos] != doc_id:
+            result.append(doc_id)
+    return result
+
+
+def union(lists):
+    return sorted(set().union(*lists))
+
+
+# Evaluates query trees against an InvertedIndexer, one query at a time
+class QueryPlanner:
+    def __init__(self, index):
+        self.index = index
+        self._universe = None
+
+    def universe(self):
+        """
+        Sorted live doc IDs; only materialized for queries with an unrestricted NOT.
+        """
+        if self._universe is None:
+            deleted = self.index.docs.deleted
+            self._universe = [doc_id for doc_id in range(len(self.index.docs)) if doc_id not in deleted]
+        return self._universe
+
+    def estimate(self, node):
+        """
+        Upper bound on the number of documents a node matches, used to order intersections.
+        """
+        if isinstance(node, Term):
+            return self.index.doc_freq(node.term)
+        if isinstance(node, Or):
+            return sum(self.estimate(child) for child in node.children)
+        if isinstance(node, And):
+            positives = [child for child in node.children if not isinstance(child, Not)]
+            if positives:
+                return min(self.estimate(child) for child in positives)
+        return self.index.docs.live_count()
+
+    def evaluate(self, node):
+        """
+        Return the sorted doc IDs matching a query tree.
+        """
+        if node is None:
+            return []
+        if isinstance(node, Term):
+            return self.index.doc_ids(node.term)
+        if isinstance(node, Or):
+            return union(self.evaluate(child) for child in node.children)
+        if isinstance(node, Not):
+            return difference(self.universe(), self.evaluate(node.child))
+        return self.evaluate_and(node)
+
+    def evaluate_and(self, node):
+        positives = [child for child in node.children if not isinstance(child, Not)]
+        negatives = [child.child for child in node.children if isinstance(child, Not)]
+
+        # Intersect from the rarest operand up, so each step gallops a short list through a longer one;
+        # a term's postings are only decoded in the blocks the matches so far fall in
+        if positives:
+            positives.sort(key=self.estimate)
+            result = self.evaluate(positives[0])
+            for child in positives[1:]:
+                if not result:
+                    return result
+                if isinstance(child, Term):
+                    result = self.index.filter_doc_ids(child.term, result)
+                else:
+                    result = intersect(result, self.evaluate(child))
+        else:
+            result = self.universe()
+
+        # NOT operands are subtracted from what the positive operands matched
+        for child in negatives:
+            if not result:
+                break
+            result = difference(result, self.evaluate(child))
+        return result
@@ -0,0 +1,111 @@
+import os
+import string
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from indexer import DocTable, InvertedIndexer
+# Analyzers map document content to (token count, {term: frequency}); they live in analysis.py
+from analysis import keyword_analyzer, noun_analyzer, term_analyzer, word_analyzer
+
+# Files per worker task; a corpus smaller than one shard is indexed in-process
+SHARD_SIZE = 256
+
+def walk_corpus(base_path):
+    """
+    Yield (category, title, path) for every document, in the order the loaders have always crawled them.
+    """
+    for foldername in os.listdir(base_path):
+        folder_path = os.path.join(base_path, foldername)
+        if os.path.isdir(folder_path):
+            for filename in os.listdir(folder_path):
+                yield foldername, filename, os.path.join(folder_path, filename)
+
+
+# Function to list (title, path) for every document
+def list_documents(base_path):
+    return [(title, path) for _, title, path in walk_corpus(base_path)]
+
+
+def read_document(path):
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        return f.read()
+
+
+# Document record whose "content" is read from disk each time it is accessed, never kept in memory
+class LazyDocument(dict):
+    def __missing__(self, key):
+        if key == "content":
+            return read_document(self["path"])
+        raise KeyError(key)
+
+
+def iter_documents(base_path):
+    """
+    Yield documents one at a time as dicts with category, title, path and content.
+    """
+    for category, title, path in walk_corpus(base_path):
+        yield {"category": category, "title": title, "path": path, "content": read_document(path)}
+
+
+# Function to load documents and create the content hierarchy (category -> documents)
+def load_documents(base_path):
+    """
+    Load document metadata from the specified base path, organized into categories.
+    Content is fetched from disk on demand via doc["content"].
+    """
+    documents = {}
+    for category, title, path in walk_corpus(base_path):
+        documents.setdefault(category, []).append(LazyDocument(title=title, path=path))
+    return documents
+
+
+def index_shard(files, analyzer):
+    """
+    Build partial title and content indexes for a list of (title, path) files.
+    Doc IDs are local to the shard and follow the order of files.
+    """
+    docs = DocTable()
+    title_index = InvertedIndexer(docs)
+    content_index = InvertedIndexer(docs)
+    for title, file_path in files:
+        content = read_document(file_path)
+        title_index.add(title.strip(string.punctuation).lower(), file_path)
+        length, terms = analyzer(content)
+        content_index.set_doc_length(file_path, length)
+        for term, freq in terms.items():
+            content_index.add(term, file_path, freq)
+        if analyzer.surface_counts:
+            for term, freq in analyzer.surface(content, terms).items():
+                if freq != terms[term]:
+                    content_index.add_surface(term, file_path, freq)
+    return title_index, content_index
+
+
+def build_indexes(base_path, analyzer, indexer_class=InvertedIndexer, workers=None, shard_size=SHARD_SIZE):
+    """
+    Crawl base_path and build (title_index, content_index), tokenizing shards of files in
+    parallel worker processes. Partial indexes are merged in crawl order, so doc IDs are the
+    same as a sequential crawl no matter which worker finishes first.
+    """
+    files = list_documents(base_path)
+    shards = [files[i:i + shard_size] for i in range(0, len(files), shard_size)]
+
+    docs = DocTable()
+    title_index = indexer_class(docs)
+    content_index = indexer_class(docs)
+
+    if workers == 1 or len(shards) <= 1:
+        merge_shards(docs, title_index, content_index, map(index_shard, shards, repeat(analyzer)))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            merge_shards(docs, title_index, content_index, pool.map(index_shard, shards, repeat(analyzer)))
+    return title_index, content_index
+
+
+def merge_shards(docs, title_index, content_index, partials):
+    for part_title, part_content in partials:
+        offset = len(docs)
+        for doc_id in range(len(part_title.docs)):
+            docs.add(part_title.docs.path(doc_id))
+        title_index.extend(part_title, offset)
+        content_index.extend(part_content, offset)
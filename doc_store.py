@@ -0,0 +1,229 @@
+import os
+import re
+import sys
+import lzma
+import mmap
+import zlib
+import shutil
+import struct
+import threading
+from array import array
+from collections import OrderedDict
+
+from corpus import read_document
+from positional import token_spans
+
+# store.bin layout (all integers little-endian):
+#   header        - magic, doc count, block count, compression ID
+#   doc table     - per doc ID: block number, byte offset in the uncompressed block, UTF-8 text length, token count
+#   block offsets - block count + 1 file offsets of the compressed blocks
+#   blocks        - documents packed in doc-ID order into blocks of about BLOCK_SIZE bytes, each
+#                   compressed on its own. A document is its UTF-8 text followed by the (start, end)
+#                   byte offsets of its tokens (see positional.token_spans) as uint32 pairs.
+STORE_FILE = "store.bin"
+STORE_MAGIC = b"IRS1"
+STORE_HEADER = struct.Struct("<4sIII")
+DOC_ENTRY = struct.Struct("<IIII")
+BLOCK_OFFSET = struct.Struct("<Q")
+
+# Uncompressed bytes per block: larger blocks compress better, smaller ones decompress faster
+BLOCK_SIZE = 1 << 16
+
+# Decompressed blocks kept per open store
+CACHED_BLOCKS = 16
+
+COMPRESSORS = {"zlib": (zlib.compress, zlib.decompress), "lzma": (lzma.compress, lzma.decompress)}
+COMPRESSION_IDS = {name: compression_id for compression_id, name in enumerate(COMPRESSORS)}
+COMPRESSION_NAMES = list(COMPRESSORS)
+
+# Tokens shown around the query terms in a snippet
+SNIPPET_TOKENS = 30
+
+WHITESPACE = re.compile(r"\s+")
+
+# ASCII punctuation, any of which may be Markdown syntax
+MARKDOWN_SPECIAL = re.compile(r"([!-/:-@\[-`{-~])")
+
+
+def byte_spans(text, spans):
+    """
+    Convert (start, end) character offsets in text to offsets in its UTF-8 encoding.
+    """
+    result = array("I")
+    char = byte = 0
+    for start, end in spans:
+        byte += len(text[char:start].encode("utf-8"))
+        start_byte = byte
+        byte += len(text[start:end].encode("utf-8"))
+        char = end
+        result.extend((start_byte, byte))
+    return result
+
+
+def write_doc_store(path, docs, compression="zlib", block_size=BLOCK_SIZE, read=read_document):
+    """
+    Write the text of every document in a doc table (deleted ones as empty) to a store directory.
+    """
+    compress = COMPRESSORS[compression][0]
+    entries = []
+    blocks = []
+    block = bytearray()
+
+    for doc_id in range(len(docs)):
+        text = "" if doc_id in docs.deleted else read(docs.path(doc_id))
+        encoded = text.encode("utf-8")
+        spans = byte_spans(text, token_spans(text)) if text else array("I")
+        if block and len(block) + len(encoded) > block_size:
+            blocks.append(compress(bytes(block)))
+            block = bytearray()
+        entries.append(DOC_ENTRY.pack(len(blocks), len(block), len(encoded), len(spans) // 2))
+        block += encoded
+        if sys.byteorder != "little":
+            spans.byteswap()
+        block += spans.tobytes()
+    if block:
+        blocks.append(compress(bytes(block)))
+
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, STORE_FILE), "wb") as f:
+        f.write(STORE_HEADER.pack(STORE_MAGIC, len(docs), len(blocks), COMPRESSION_IDS[compression]))
+        f.writelines(entries)
+        offset = 0
+        for data in blocks:
+            f.write(BLOCK_OFFSET.pack(offset))
+            offset += len(data)
+        f.write(BLOCK_OFFSET.pack(offset))
+        f.writelines(blocks)
+
+
+def escape_markdown(text):
+    """
+    Backslash-escape every ASCII punctuation character, so text renders literally in Markdown.
+    """
+    return MARKDOWN_SPECIAL.sub(r"\\\1", text)
+
+
+def store_exists(path):
+    try:
+        with open(os.path.join(path, STORE_FILE), "rb") as f:
+            return f.read(len(STORE_MAGIC)) == STORE_MAGIC
+    except OSError:
+        return False
+
+
+# Read-only document store; a document costs one block decompression (cached) and nothing else
+class DocStore:
+    def __init__(self, path, docs=None):
+        """
+        docs: the doc table the store was written from, to look documents up by path.
+        """
+        self.path = path
+        self.ids = {} if docs is None else {docs.path(doc_id): doc_id for doc_id in range(len(docs))
+                                            if doc_id not in docs.deleted}
+        with open(os.path.join(path, STORE_FILE), "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count, self.block_count, compression_id = STORE_HEADER.unpack_from(self.data, 0)
+        if magic != STORE_MAGIC:
+            raise ValueError("not a document store file")
+        self.decompress = COMPRESSORS[COMPRESSION_NAMES[compression_id]][1]
+        self.offsets_start = STORE_HEADER.size + self.count * DOC_ENTRY.size
+        self.blocks_start = self.offsets_start + (self.block_count + 1) * BLOCK_OFFSET.size
+        self._blocks = OrderedDict()  # block number -> decompressed bytes, least recently used first
+        self._lock = threading.Lock()
+
+    def _block(self, i):
+        with self._lock:
+            block = self._blocks.get(i)
+            if block is not None:
+                self._blocks.move_to_end(i)
+                return block
+        start, end = struct.unpack_from("<QQ", self.data, self.offsets_start + i * BLOCK_OFFSET.size)
+        block = self.decompress(self.data[self.blocks_start + start:self.blocks_start + end])
+        with self._lock:
+            self._blocks[i] = block
+            while len(self._blocks) > CACHED_BLOCKS:
+                self._blocks.popitem(last=False)
+        return block
+
+    def _record(self, doc_id):
+        # (block, offset of the text, text length, token count)
+        if not 0 <= doc_id < self.count:
+            raise IndexError(doc_id)
+        block, offset, length, tokens = DOC_ENTRY.unpack_from(self.data, STORE_HEADER.size + doc_id * DOC_ENTRY.size)
+        if not length:
+            return b"", 0, 0, 0  # Empty or deleted; a trailing one points past the last written block
+        return self._block(block), offset, length, tokens
+
+    def doc_id(self, path):
+        return self.ids.get(path)
+
+    def document(self, doc_id):
+        block, offset, length, _ = self._record(doc_id)
+        return block[offset:offset + length].decode("utf-8")
+
+    def snippet(self, doc_id, positions, width=SNIPPET_TOKENS):
+        """
+        Markdown excerpt of about width tokens around the densest run of the given token positions
+        (e.g. a document's query-term positions from a PositionalIndex built from this store's
+        text), with those tokens in bold. Only the excerpt is decoded; the positions locate it
+        through the stored token offsets. Positions past the document's last token are ignored.
+        """
+        block, offset, length, tokens = self._record(doc_id)
+        if not tokens:
+            return ""
+        spans = struct.unpack_from(f"<{2 * tokens}I", block, offset + length)
+        marked = {position for position in positions if 0 <= position < tokens}
+        start, end = best_window(sorted(marked), tokens, width)
+        parts = []
+        previous = spans[2 * start]
+        for position in range(start, end):
+            token_start, token_end = spans[2 * position], spans[2 * position + 1]
+            between = block[offset + previous:offset + token_start].decode("utf-8")  # Spaces and punctuation-only words
+            parts.append(escape_markdown(WHITESPACE.sub(" ", between)))  # Line breaks would end the Markdown paragraph
+            token = escape_markdown(block[offset + token_start:offset + token_end].decode("utf-8"))
+            parts.append(f"**{token}**" if position in marked else token)
+            previous = token_end
+        text = "".join(parts)
+        return ("..." if start > 0 else "") + text + ("..." if end < tokens else "")
+
+    def __len__(self):
+        return self.count
+
+
+def best_window(positions, tokens, width):
+    """
+    Return (start, end) of the width-token window holding the most of the sorted positions
+    (the first such window), centred on them where the document allows.
+    """
+    if not positions:
+        return 0, min(width, tokens)
+    best = (0, 0)  # (hits, index of the first hit)
+    first = 0
+    for last in range(len(positions)):
+        while positions[last] - positions[first] >= width:
+            first += 1
+        if last - first + 1 > best[0]:
+            best = (last - first + 1, first)
+    hits, first = best
+    span_start, span_end = positions[first], positions[first + hits - 1] + 1
+    start = max(0, min(span_start - (width - (span_end - span_start)) // 2, tokens - width))
+    return start, min(tokens, start + width)
+
+
+def open_doc_store(index, compression="zlib"):
+    """
+    Return the DocStore of a saved (segment-backed) index's documents, by its doc IDs. The store is
+    written next to the index's segment on first use, so it is built once per generation and
+    removed with it.
+    """
+    path = os.path.join(os.path.dirname(index.segment.path.rstrip(os.sep)), "store")
+    if not store_exists(path):
+        # Written aside and renamed into place, so readers never see a partial store
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        shutil.rmtree(temp_path, ignore_errors=True)
+        write_doc_store(temp_path, index.docs, compression)
+        try:
+            os.rename(temp_path, path)
+        except OSError:
+            shutil.rmtree(temp_path, ignore_errors=True)  # Another process wrote it first
+    return DocStore(path, index.docs)
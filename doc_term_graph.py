@@ -0,0 +1,99 @@
+import numpy as np
+
+from positional import tokenize
+
+
+def _gather(indptr, indices, rows):
+    """
+    Concatenate indices[indptr[r]:indptr[r + 1]] for every r in rows, without a Python loop.
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    starts = indptr[rows]
+    lengths = indptr[rows + 1] - starts
+    total = int(lengths.sum())
+    if not total:
+        return np.zeros(0, dtype=indices.dtype)
+    # Position k of the output reads indices[start of its row + offset within the row]
+    row_offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return indices[row_offsets + np.arange(total)]
+
+
+def _transpose(indptr, indices, num_columns):
+    """
+    Return (indptr, indices) of the transposed CSR structure; rows stay sorted within each column.
+    """
+    rows = np.repeat(np.arange(len(indptr) - 1, dtype=np.int32), np.diff(indptr))
+    order = np.argsort(indices, kind="stable")
+    counts = np.bincount(indices, minlength=num_columns)
+    return np.concatenate(([0], np.cumsum(counts))).astype(np.int64), rows[order]
+
+
+# Bipartite document-term adjacency held as CSR arrays in both directions
+class DocTermGraph:
+    def __init__(self, paths, terms, term_indptr, term_docs):
+        """
+        paths: doc ID -> path; terms: term ID -> term; term_indptr/term_docs: sorted doc IDs of each term (CSR).
+        """
+        self.paths = list(paths)
+        self.terms = list(terms)
+        self.term_ids = {term: term_id for term_id, term in enumerate(self.terms)}
+        self.term_indptr = np.asarray(term_indptr, dtype=np.int64)
+        self.term_docs = np.asarray(term_docs, dtype=np.int32)
+        self.doc_indptr, self.doc_terms = _transpose(self.term_indptr, self.term_docs, len(self.paths))
+
+    @classmethod
+    def from_documents(cls, documents):
+        """
+        Build from an iterable of {"path", "content"} documents, linking each to its distinct normalized tokens.
+        """
+        paths = []
+        term_ids = {}
+        doc_indptr = [0]
+        doc_terms = []
+        for doc in documents:
+            paths.append(doc["path"])
+            doc_terms.extend(term_ids.setdefault(term, len(term_ids)) for term in set(tokenize(doc["content"])))
+            doc_indptr.append(len(doc_terms))
+        term_indptr, term_docs = _transpose(np.array(doc_indptr, dtype=np.int64),
+                                            np.array(doc_terms, dtype=np.int32), len(term_ids))
+        return cls(paths, term_ids, term_indptr, term_docs)
+
+    @classmethod
+    def from_index(cls, indexer):
+        """
+        Build from an InvertedIndexer's postings; doc IDs are the index's own.
+        """
+        terms = list(indexer.index)
+        postings = [np.array(indexer.doc_ids(term), dtype=np.int32) for term in terms]
+        term_indptr = np.concatenate(([0], np.cumsum([len(doc_ids) for doc_ids in postings]))).astype(np.int64)
+        term_docs = np.concatenate(postings) if postings else np.zeros(0, dtype=np.int32)
+        paths = [indexer.docs.path(doc_id) for doc_id in range(len(indexer.docs))]
+        return cls(paths, terms, term_indptr, term_docs)
+
+    def save(self, path):
+        np.savez(path, paths=np.array(self.paths, dtype=str), terms=np.array(self.terms, dtype=str),
+                 term_indptr=self.term_indptr, term_docs=self.term_docs)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["paths"].tolist(), data["terms"].tolist(), data["term_indptr"], data["term_docs"])
+
+    def docs_of_terms(self, terms):
+        """
+        Return the sorted doc IDs linked to any of terms (unknown terms are ignored).
+        """
+        term_ids = [self.term_ids[term] for term in terms if term in self.term_ids]
+        return np.unique(_gather(self.term_indptr, self.term_docs, term_ids))
+
+    def related_docs(self, doc_ids, k=10):
+        """
+        Return up to k (doc ID, shared term count) pairs for documents outside doc_ids that share
+        the most terms with them.
+        """
+        term_ids = np.unique(_gather(self.doc_indptr, self.doc_terms, doc_ids))
+        counts = np.bincount(_gather(self.term_indptr, self.term_docs, term_ids), minlength=len(self.paths))
+        counts[np.asarray(doc_ids, dtype=np.int64)] = 0
+        candidates = np.flatnonzero(counts)
+        order = np.lexsort((candidates, -counts[candidates]))[:k]
+        return [(int(doc_id), int(counts[doc_id])) for doc_id in candidates[order]]
@@ -0,0 +1,96 @@
+import os
+import numpy as np
+
+from boolean_query import And, QueryPlanner, Term
+
+# Belief assigned to a root node that has no evidence
+ROOT_PRIOR = 0.5
+
+
+def category_of(path):
+    return os.path.basename(os.path.dirname(path))
+
+
+# Query evidence and per-category statistics drawn from an InvertedIndexer
+class EvidenceIndex:
+    def __init__(self, indexer):
+        self.indexer = indexer
+        docs = indexer.docs
+        self.live = np.ones(len(docs), dtype=bool)
+        self.live[np.array(sorted(docs.deleted), dtype=np.int64)] = False
+
+        # Category of every doc ID, and the number of live documents per category
+        paths = [docs.path(doc_id) for doc_id in range(len(docs))]
+        self.categories = sorted({category_of(path) for path in docs.live_paths()})
+        category_ids = {category: i for i, category in enumerate(self.categories)}
+        self.doc_categories = np.array([category_ids.get(category_of(path), -1) for path in paths], dtype=np.int64)
+        self.category_sizes = np.bincount(self.doc_categories[self.live], minlength=len(self.categories))
+        self._category_freqs = {}  # term -> documents containing it per category
+
+    def matching_docs(self, terms):
+        """
+        Return the sorted doc IDs containing every term.
+        """
+        if not terms:
+            return []
+        return QueryPlanner(self.indexer).evaluate(And([Term(term) for term in terms]))
+
+    def evidence(self, terms):
+        """
+        Boolean vector over doc IDs: True where the document contains every term.
+        """
+        matched = np.zeros(len(self.live), dtype=bool)
+        matched[np.array(self.matching_docs(terms), dtype=np.int64)] = True
+        return matched
+
+    def category_freqs(self, terms):
+        """
+        Number of documents per category containing every term (cached for single terms).
+        """
+        if len(terms) == 1 and terms[0] in self._category_freqs:
+            return self._category_freqs[terms[0]]
+        doc_ids = np.array(self.matching_docs(terms), dtype=np.int64)
+        freqs = np.bincount(self.doc_categories[doc_ids], minlength=len(self.categories))
+        if len(terms) == 1:
+            self._category_freqs[terms[0]] = freqs
+        return freqs
+
+    def relevance_probabilities(self, terms):
+        """
+        {category: share of its documents containing every term}
+        """
+        freqs = self.category_freqs(terms)
+        probs = np.divide(freqs, self.category_sizes, out=np.zeros(len(freqs)), where=self.category_sizes > 0)
+        return dict(zip(self.categories, probs.tolist()))
+
+
+# Two-level belief network: the query is the root and every live document is its child
+class BeliefNetwork:
+    def __init__(self, evidence_index):
+        self.evidence_index = evidence_index
+        self.doc_ids = np.flatnonzero(evidence_index.live)
+        docs = evidence_index.indexer.docs
+        self.nodes = [f"{category_of(docs.path(doc_id))}_{os.path.basename(docs.path(doc_id))}"
+                      for doc_id in self.doc_ids]
+
+    def document_evidence(self, terms):
+        """
+        Evidence per document node: 1.0 if it contains the query terms, else 0.0.
+        """
+        return self.evidence_index.evidence(terms)[self.doc_ids].astype(np.float64)
+
+    def joint_probability(self, evidence, query_evidence=True):
+        """
+        Belief per document node. Observed nodes take their evidence; unobserved ones (NaN)
+        take their parent's belief. The query root's belief is its evidence, or ROOT_PRIOR if None.
+        """
+        query_belief = ROOT_PRIOR if query_evidence is None else float(query_evidence)
+        return np.where(np.isnan(evidence), query_belief, evidence)
+
+    def rank(self, evidence):
+        """
+        Return (node, probability) pairs, most probable first (ties keep document order).
+        """
+        probs = self.joint_probability(evidence)
+        order = np.argsort(-probs, kind="stable")
+        return [(self.nodes[i], float(probs[i])) for i in order]
@@ -0,0 +1,133 @@
+import os
+import json
+import string
+import threading
+from collections import OrderedDict
+from html import escape
+from urllib.parse import quote
+
+from analysis import STOP_WORDS
+from bm25 import BM25Index
+from corpus import read_document
+from positional import WORD
+
+LINKS_FILE = "links.json"
+
+# A term is linked when it is a word of at least MIN_TERM_LENGTH letters found in at least
+# MIN_DOC_FREQ documents (so it has somewhere to link from) and at most MAX_DOC_RATIO of them
+MIN_TERM_LENGTH = 4
+MIN_DOC_FREQ = 2
+MAX_DOC_RATIO = 0.5
+
+# Terms kept in the link table, most distinctive (highest best-document BM25 score) first
+MAX_LINK_TERMS = 500
+
+# Rendered documents kept per Hyperlinker
+CACHED_PAGES = 64
+
+# Text as HTML that Markdown leaves alone: ASCII punctuation (HTML and Markdown syntax) as
+# character references (line breaks become &#10; too, so a page is a single-line HTML block)
+HTML_TEXT = str.maketrans({char: f"&#{ord(char)};" for char in string.punctuation})
+
+
+def is_salient(term, doc_freq, num_live_docs):
+    return (len(term) >= MIN_TERM_LENGTH and term.isalpha() and term not in STOP_WORDS
+            and MIN_DOC_FREQ <= doc_freq <= MAX_DOC_RATIO * num_live_docs)
+
+
+def link_targets(index, max_terms=MAX_LINK_TERMS):
+    """
+    {term: path} mapping each salient term of an index to its best-ranked (BM25) document.
+    """
+    bm25 = BM25Index(index)
+    best = []  # (score, term, doc ID)
+    for term in index.index:
+        doc_ids, scores = bm25.term_scores(term)
+        if not is_salient(term, len(doc_ids), bm25.num_live_docs):
+            continue
+        i = int(scores.argmax())  # The first (lowest doc ID) of any tie
+        best.append((float(scores[i]), term, int(doc_ids[i])))
+    best.sort(key=lambda item: (-item[0], item[1]))
+    return {term: index.docs.path(doc_id) for _, term, doc_id in best[:max_terms]}
+
+
+def open_link_targets(index):
+    """
+    Return the link table of a saved (segment-backed) index. It is written next to the index's
+    segment on first use, so it is built once per generation and removed with it.
+    """
+    path = os.path.join(os.path.dirname(index.segment.path.rstrip(os.sep)), LINKS_FILE)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)["terms"]
+    except (OSError, ValueError, KeyError):
+        pass
+    targets = link_targets(index)
+    # Written aside and renamed into place, so readers never see a partial table
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump({"terms": targets}, f)
+    try:
+        os.rename(temp_path, path)
+    except OSError:
+        os.remove(temp_path)  # Another process wrote it first
+    return targets
+
+
+def document_link(path):
+    """
+    Relative URL that opens a document in the viewer (see assignment4's "doc" query parameter).
+    """
+    return "?doc=" + quote(path, safe="")
+
+
+# Renders documents as HTML with each linked term pointing to its target document, in one
+# regex pass over the text; the rendered HTML of recently viewed documents is kept
+class Hyperlinker:
+    def __init__(self, targets, cached_pages=CACHED_PAGES):
+        """
+        targets: {term: path}, e.g. from open_link_targets.
+        """
+        self.targets = targets
+        self.anchors = {term: f'<a href="{escape(document_link(path))}" target="_self">'
+                        for term, path in targets.items()}
+        self.cached_pages = cached_pages
+        self._pages = OrderedDict()  # path -> HTML, least recently used first
+        self._lock = threading.Lock()
+
+    def render(self, path, content):
+        """
+        HTML of a document's text with its linked terms as links (none to the document itself).
+        Words are found as the index tokenizes them, and surrounding punctuation stays outside the link.
+        The text keeps its line breaks and spacing and is safe to pass to st.markdown with
+        unsafe_allow_html: it is one HTML block, so no Markdown inside it is interpreted.
+        """
+        def link(match):
+            word = match.group()
+            term = word.strip(string.punctuation)
+            anchor = self.anchors.get(term.lower())
+            if anchor is None or self.targets[term.lower()] == path:
+                return word.translate(HTML_TEXT)
+            start = len(word) - len(word.lstrip(string.punctuation))
+            end = start + len(term)
+            return (word[:start].translate(HTML_TEXT) + anchor + term.translate(HTML_TEXT) + "</a>"
+                    + word[end:].translate(HTML_TEXT))
+
+        body = WORD.sub(link, content).replace("\r", "").replace("\n", "&#10;")
+        return f'<div style="white-space: pre-wrap">{body}</div>'
+
+    def html(self, path, read=read_document):
+        """
+        render() of the document at path, read with read(path) only when not cached.
+        """
+        with self._lock:
+            page = self._pages.get(path)
+            if page is not None:
+                self._pages.move_to_end(path)
+                return page
+        page = self.render(path, read(path))
+        with self._lock:
+            self._pages[path] = page
+            while len(self._pages) > self.cached_pages:
+                self._pages.popitem(last=False)
+        return page
@@ -0,0 +1,117 @@
+import os
+import time
+import threading
+
+from corpus import LazyDocument, build_indexes, term_analyzer
+from indexer import InvertedIndexer
+from manifest import current_generation, segment_paths, update_indexes
+from query_cache import QueryCache
+
+# Seconds between checks for a generation published by another process
+CHECK_INTERVAL = 2.0
+
+# Lowercased-token index shared by assignment4, assignment5 and assignment7
+TERMS_INDEX_PATH = os.path.join("index", "terms")
+
+
+# Read-only view of one published generation; never changes once created
+class IndexHandle:
+    def __init__(self, generation, title_index, content_index):
+        self.generation = generation
+        self.title_index = title_index
+        self.content_index = content_index
+        self._documents = None
+
+    def documents(self):
+        """
+        {category: [LazyDocument(title, path)]} for the live documents, in doc-ID order.
+        """
+        if self._documents is None:
+            documents = {}
+            for path in self.content_index.docs.live_paths():
+                category = os.path.basename(os.path.dirname(path))
+                documents.setdefault(category, []).append(LazyDocument(title=os.path.basename(path), path=path))
+            self._documents = documents
+        return self._documents
+
+
+# Load-once index shared by every session and rerun of an app, swapped when a new generation is published
+class IndexService:
+    def __init__(self, base_path, index_path, analyzer, indexer_class=InvertedIndexer, rebuild=None,
+                 check_interval=CHECK_INTERVAL):
+        """
+        rebuild(base_path) -> (title_index, content_index) builds from scratch; it defaults to
+        build_indexes with analyzer and indexer_class.
+        """
+        self.base_path = base_path
+        self.index_path = os.path.abspath(index_path)  # Unaffected by later changes of working directory
+        self.analyzer = analyzer
+        self.indexer_class = indexer_class
+        self.rebuild = rebuild or (lambda path: build_indexes(path, analyzer, indexer_class))
+        self.check_interval = check_interval
+        self.cache = QueryCache()  # Results are keyed to handle().generation
+        self._handle = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def handle(self):
+        """
+        Return the current IndexHandle. Take it once per script run and read everything through it,
+        so a swap mid-run never mixes generations.
+        """
+        handle = self._handle
+        if handle is not None and time.monotonic() - self._checked < self.check_interval:
+            return handle
+        with self._lock:
+            if self._handle is None:
+                self._update()
+            elif time.monotonic() - self._checked >= self.check_interval:
+                generation = current_generation(self.index_path)
+                if generation is not None and generation != self._handle.generation:
+                    try:
+                        self._handle = self._open(generation)
+                    except OSError:
+                        pass  # Superseded and removed while opening; pick up the newer one next check
+            self._checked = time.monotonic()
+            return self._handle
+
+    def refresh(self):
+        """
+        Re-index files changed on disk now, publish a new generation if needed and swap to it.
+        """
+        with self._lock:
+            self._update()
+            self._checked = time.monotonic()
+            return self._handle
+
+    def _update(self):
+        title_index, content_index = update_indexes(self.base_path, self.index_path, self.analyzer,
+                                                    self.indexer_class, self.rebuild)
+        self._handle = IndexHandle(content_index.generation, title_index, content_index)
+
+    def _open(self, generation):
+        title_path, content_path = segment_paths(self.index_path, generation)
+        title_index, content_index = self.indexer_class.load(title_path), self.indexer_class.load(content_path)
+        title_index.generation = content_index.generation = generation
+        return IndexHandle(generation, title_index, content_index)
+
+
+_services = {}
+_services_lock = threading.Lock()
+
+
+def open_service(base_path, index_path, analyzer, indexer_class=InvertedIndexer, rebuild=None):
+    """
+    Return the process-wide IndexService for index_path, creating it on first use
+    (apps re-executed by Streamlit redefine their classes, so the directory alone is the key).
+    """
+    key = os.path.abspath(index_path)
+    with _services_lock:
+        service = _services.get(key)
+        if service is None:
+            service = _services[key] = IndexService(base_path, index_path, analyzer, indexer_class, rebuild)
+        return service
+
+
+def open_term_service(base_path, index_path=TERMS_INDEX_PATH):
+    return open_service(base_path, index_path, term_analyzer)
@@ -0,0 +1,318 @@
+import os
+from array import array
+from itertools import accumulate
+
+from boolean_query import intersect
+from postings_codec import DEFAULT_CODEC
+from segment import SURFACE_SEGMENT, Segment, write_segment
+from termdict import TermDictionary
+
+
+# Document table mapping document paths to dense integer IDs
+class DocTable:
+    def __init__(self, paths=(), deleted=()):
+        self.paths = list(paths)  # doc ID -> path
+        self.deleted = set(deleted)  # tombstoned doc IDs
+        self.ids = {path: doc_id for doc_id, path in enumerate(self.paths) if doc_id not in self.deleted}  # path -> live doc ID
+
+    def add(self, doc_path):
+        """
+        Return the ID of a document path, assigning the next free ID to new (or deleted) paths.
+        """
+        doc_id = self.ids.get(doc_path)
+        if doc_id is None:
+            doc_id = len(self.paths)
+            self.ids[doc_path] = doc_id
+            self.paths.append(doc_path)
+        return doc_id
+
+    def delete(self, doc_path):
+        """
+        Tombstone a document. Its postings are skipped from now on; re-adding the path gives it a new ID.
+        """
+        doc_id = self.ids.pop(doc_path)
+        self.deleted.add(doc_id)
+        return doc_id
+
+    def path(self, doc_id):
+        return self.paths[doc_id]
+
+    def live_count(self):
+        return len(self.paths) - len(self.deleted)
+
+    def live_paths(self):
+        return [path for doc_id, path in enumerate(self.paths) if doc_id not in self.deleted]
+
+    def __len__(self):
+        return len(self.paths)
+
+
+# Posting list builder storing doc IDs as delta-encoded unsigned ints, with a term frequency per posting
+class PostingsBuilder:
+    def __init__(self):
+        self.gaps = array("I")  # first entry is the doc ID itself, then gaps between IDs
+        self.freqs = array("I")  # term frequency of each posting
+        self.last = -1
+
+    def append(self, doc_id, freq=1):
+        """
+        Append a doc ID. IDs must arrive in non-decreasing order; a repeated ID adds to its frequency.
+        """
+        if doc_id == self.last:
+            self.freqs[-1] += freq
+            return False
+        if doc_id < self.last:
+            raise ValueError(f"postings must be appended in doc-ID order ({doc_id} < {self.last})")
+        self.gaps.append(doc_id - max(self.last, 0))
+        self.freqs.append(freq)
+        self.last = doc_id
+        return True
+
+    @classmethod
+    def from_postings(cls, postings):
+        """
+        Return an appendable copy of any postings object exposing gaps and freqs arrays.
+        """
+        builder = cls()
+        builder.gaps = array("I", postings.gaps)
+        builder.freqs = array("I", postings.freqs)
+        builder.last = sum(builder.gaps) if builder.gaps else -1
+        return builder
+
+    def doc_ids(self):
+        return list(accumulate(self.gaps))
+
+    def items(self):
+        return zip(accumulate(self.gaps), self.freqs)
+
+    def __len__(self):
+        return len(self.gaps)
+
+
+# Appendable term -> postings mapping over a saved segment's terms: a term's saved postings are
+# shared until new postings are assigned to it (see InvertedIndexer.patch)
+class PatchedTerms:
+    def __init__(self, base):
+        self.base = base
+        self.changed = {}
+
+    def get(self, term, default=None):
+        postings = self.changed.get(term)
+        return postings if postings is not None else self.base.get(term, default)
+
+    def __getitem__(self, term):
+        postings = self.get(term)
+        if postings is None:
+            raise KeyError(term)
+        return postings
+
+    def __setitem__(self, term, postings):
+        self.changed[term] = postings
+
+    def __contains__(self, term):
+        return term in self.changed or term in self.base
+
+    def __iter__(self):
+        yield from self.base
+        yield from (term for term in self.changed if term not in self.base)
+
+    def items(self):
+        return ((term, self[term]) for term in self)
+
+    def __len__(self):
+        return len(self.base) + sum(1 for term in self.changed if term not in self.base)
+
+
+# Inverted index over integer doc IDs, shared by the assignment search engines
+class InvertedIndexer:
+    generation = 0  # Published generation this index was opened from (see manifest.update_indexes)
+
+    def __init__(self, docs=None):
+        self.docs = docs if docs is not None else DocTable()  # Share one table between indexes of a corpus
+        self.index = {}  # term -> PostingsBuilder
+        self.surface = {}  # term -> PostingsBuilder of surface-form counts, where they differ from the frequency
+        self.doc_lengths = array("I")  # doc ID -> number of tokens
+        self._term_dictionary = None
+
+    def add(self, term, doc_path, freq=1):
+        self._builder(term).append(self.docs.add(doc_path), freq)
+
+    def add_surface(self, term, doc_path, freq):
+        """
+        Record a document's surface-form count of a term (see Analyzer.surface), after add().
+        """
+        self._surface_builder(term).append(self.docs.add(doc_path), freq)
+
+    def _builder(self, term):
+        postings = self.index.get(term)
+        if postings is None:
+            postings = self.index[term] = PostingsBuilder()
+            self._term_dictionary = None  # Vocabulary changed
+        elif not isinstance(postings, PostingsBuilder):
+            postings = self.index[term] = PostingsBuilder.from_postings(postings)  # Saved postings, copied on first append
+        return postings
+
+    def _surface_builder(self, term):
+        postings = self.surface.get(term)
+        if postings is None:
+            postings = self.surface[term] = PostingsBuilder()
+        elif not isinstance(postings, PostingsBuilder):
+            postings = self.surface[term] = PostingsBuilder.from_postings(postings)
+        return postings
+
+    def set_doc_length(self, doc_path, length):
+        self._set_length(self.docs.add(doc_path), length)
+
+    def _set_length(self, doc_id, length):
+        if len(self.doc_lengths) <= doc_id:
+            self.doc_lengths.extend([0] * (doc_id + 1 - len(self.doc_lengths)))
+        self.doc_lengths[doc_id] = length
+
+    def extend(self, other, offset):
+        """
+        Append the postings and doc lengths of a partial index whose doc IDs start at offset.
+
+        The partial index's documents must already be in our doc table at offset onwards,
+        after every document we hold, so postings stay in doc-ID order.
+        """
+        for term, postings in other.index.items():
+            builder = self._builder(term)
+            for doc_id, freq in postings.items():
+                builder.append(doc_id + offset, freq)
+        for term, postings in other.surface.items():
+            builder = self._surface_builder(term)
+            for doc_id, freq in postings.items():
+                builder.append(doc_id + offset, freq)
+        for doc_id, length in enumerate(other.doc_lengths):
+            if length:
+                self._set_length(doc_id + offset, length)
+
+    def doc_length(self, doc_id):
+        return self.doc_lengths[doc_id] if doc_id < len(self.doc_lengths) else 0
+
+    def doc_length_array(self):
+        """
+        Return the length of every document, by doc ID, as an array('I').
+        """
+        lengths = self.doc_lengths
+        lengths = array("I", lengths) if isinstance(lengths, array) else lengths.toarray()
+        if len(lengths) < len(self.docs):
+            lengths.extend([0] * (len(self.docs) - len(lengths)))
+        return lengths
+
+    def term_dictionary(self):
+        """
+        Return the k-gram term dictionary for prefix/suffix/substring lookups, built on first use.
+        """
+        if self._term_dictionary is None:
+            self._term_dictionary = TermDictionary(self.index)
+        return self._term_dictionary
+
+    def doc_ids(self, term):
+        postings = self.index.get(term)
+        if postings is None:
+            return []
+        if self.docs.deleted:
+            return [doc_id for doc_id in postings.doc_ids() if doc_id not in self.docs.deleted]
+        return postings.doc_ids()
+
+    def postings(self, term):
+        """
+        Return (doc ID, term frequency) pairs for a term, skipping deleted documents.
+        """
+        postings = self.index.get(term)
+        if postings is None:
+            return []
+        if self.docs.deleted:
+            return [(doc_id, freq) for doc_id, freq in postings.items() if doc_id not in self.docs.deleted]
+        return list(postings.items())
+
+    def surface_postings(self, term):
+        """
+        Return postings() with each frequency replaced by the document's surface-form count of the
+        term, the count legacy TF-IDF scores by. Indexes without surface counts give postings().
+        """
+        postings = self.postings(term)
+        surface = self.surface.get(term)
+        if surface is None:
+            return postings
+        counts = dict(surface.items())
+        return [(doc_id, counts.get(doc_id, freq)) for doc_id, freq in postings]
+
+    def filter_doc_ids(self, term, doc_ids):
+        """
+        Return the sorted doc_ids that contain term. Saved postings are skipped through by block,
+        so only the blocks the doc IDs fall in are decoded.
+        """
+        postings = self.index.get(term)
+        if postings is None:
+            return []
+        if hasattr(postings, "intersect"):
+            return postings.intersect(doc_ids)
+        return intersect(doc_ids, self.doc_ids(term))
+
+    def block_bounds(self, term):
+        """
+        Return (last doc ID, largest freq / doc length) per block of a term's saved postings,
+        or None for in-memory postings.
+        """
+        postings = self.index.get(term)
+        if postings is None or not hasattr(postings, "skips"):
+            return None
+        return postings.block_ends(), postings.block_max_tfs()
+
+    def max_tf(self, term):
+        """
+        Return the largest freq / doc length over a term's postings (an upper bound for top-k pruning).
+        """
+        postings = self.index.get(term)
+        if postings is None:
+            return 0.0
+        max_tf = getattr(postings, "max_tf", None)  # Stored in saved segments
+        if max_tf is None:
+            max_tf = max((freq / self.doc_length(doc_id) for doc_id, freq in postings.items() if self.doc_length(doc_id)), default=0.0)
+        return max_tf
+
+    def paths(self, term):
+        return [self.docs.path(doc_id) for doc_id in self.doc_ids(term)]
+
+    def doc_freq(self, term):
+        postings = self.index.get(term)
+        if postings is None:
+            return 0
+        return len(self.doc_ids(term)) if self.docs.deleted else len(postings)
+
+    def to_dict(self):
+        return {term: self.paths(term) for term in self.index}
+
+    def patch(self, docs):
+        """
+        Return an appendable copy of this segment-backed index using doc table docs. Only the
+        postings of terms that documents are appended to are decoded; save() copies every other
+        term's postings through still encoded. The segment must stay open until the copy is saved.
+        """
+        indexer = type(self)(docs)
+        indexer.index = PatchedTerms(self.index)
+        indexer.surface = PatchedTerms(self.surface)
+        indexer.doc_lengths = self.doc_length_array()
+        return indexer
+
+    def save(self, path, codec=DEFAULT_CODEC):
+        write_segment(path, self.index, self.docs, self.doc_lengths, codec)
+        if self.surface:
+            write_segment(os.path.join(path, SURFACE_SEGMENT), self.surface, self.docs, self.doc_lengths, codec)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Open a saved segment read-only; postings are decoded from the mapped files on lookup.
+        """
+        segment = Segment(path)
+        indexer = cls.__new__(cls)
+        indexer.docs = segment.docs
+        indexer.index = segment.terms
+        indexer.surface = segment.surface.terms if segment.surface is not None else {}
+        indexer.doc_lengths = segment.doc_lengths
+        indexer.segment = segment
+        indexer._term_dictionary = None
+        return indexer
@@ -0,0 +1,78 @@
+from collections import Counter
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.linalg import svds
+
+from analysis import term_analyzer
+
+
+# Documents and queries are analyzed like the term index (lowercased, punctuation stripped)
+def tokenize(text):
+    return term_analyzer.terms(text)
+
+
+# Latent Semantic Indexing over a sparse document-term matrix
+class LSIModel:
+    def __init__(self, documents, rank=100):
+        """
+        Build the model from an iterable of {"path", "content"} documents (consumed once).
+
+        The document-term count matrix is assembled directly in CSR form and factorized
+        with a truncated SVD of at most `rank` dimensions.
+        """
+        self.paths = []
+        self.vocabulary = {}  # term -> column
+        indptr = [0]
+        indices = []
+        data = []
+        for doc in documents:
+            self.paths.append(doc["path"])
+            for term, count in Counter(tokenize(doc["content"])).items():
+                indices.append(self.vocabulary.setdefault(term, len(self.vocabulary)))
+                data.append(count)
+            indptr.append(len(indices))
+
+        self.matrix = csr_matrix(
+            (np.array(data, dtype=np.float64), np.array(indices, dtype=np.int64), np.array(indptr, dtype=np.int64)),
+            shape=(len(self.paths), len(self.vocabulary)),
+        )
+        self.rank = self._factorize(rank)
+
+    def _factorize(self, rank):
+        rank = max(1, min(rank, min(self.matrix.shape)))
+        if min(self.matrix.shape) == 0:
+            self.term_vectors = np.zeros((self.matrix.shape[1], 0))
+            self.doc_vectors = np.zeros((self.matrix.shape[0], 0))
+            return 0
+        if rank < min(self.matrix.shape) - 1:
+            u, s, vt = svds(self.matrix, k=rank)
+            order = np.argsort(s)[::-1]  # svds returns singular values in ascending order
+            u, s, vt = u[:, order], s[order], vt[order]
+        else:
+            # Rank covers (almost) the whole matrix; a dense SVD of a matrix this small is cheaper
+            u, s, vt = np.linalg.svd(self.matrix.toarray(), full_matrices=False)
+            u, s, vt = u[:, :rank], s[:rank], vt[:rank]
+
+        self.term_vectors = vt.T  # terms x rank; projects a term-space vector into the latent space
+        doc_vectors = u * s  # equals matrix @ term_vectors
+        norms = np.linalg.norm(doc_vectors, axis=1, keepdims=True)
+        self.doc_vectors = np.divide(doc_vectors, norms, out=np.zeros_like(doc_vectors), where=norms > 0)
+        return rank
+
+    def project_query(self, query):
+        """
+        Fold a query into the latent space: sum the term vectors of the query's known terms.
+        """
+        columns = [self.vocabulary[term] for term in set(tokenize(query)) if term in self.vocabulary]
+        return self.term_vectors[columns].sum(axis=0) if columns else np.zeros(self.term_vectors.shape[1])
+
+    def similarities(self, query):
+        """
+        Return the cosine similarity between the query and every document, in document order.
+        """
+        query_vector = self.project_query(query)
+        norm = np.linalg.norm(query_vector)
+        if norm == 0:
+            return np.zeros(len(self.paths))
+        return self.doc_vectors @ (query_vector / norm)
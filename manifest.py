@@ -0,0 +1,243 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+from contextlib import contextmanager
+
+from corpus import index_shard, list_documents, merge_shards
+from indexer import DocTable
+from segment import segment_exists
+
+# The manifest records, per indexed file, the mtime/size/content hash it was indexed with,
+# plus the generation number of the segments currently published under the index directory.
+MANIFEST_FILE = "manifest.json"
+
+# The published generation number on its own, so readers can poll it without parsing the manifest
+GENERATION_FILE = "CURRENT"
+
+# Rebuild from scratch once this share of doc IDs are tombstones
+COMPACT_RATIO = 0.25
+
+# Held (created exclusively) while the published generation is switched
+LOCK_FILE = "publish.lock"
+
+# A lock older than this is left over from a crashed writer and is broken
+LOCK_TIMEOUT = 30.0
+
+
+def content_hash(path):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def file_entry(path, previous=None):
+    """
+    Return the manifest entry for a file, reusing previous when mtime and size are unchanged.
+    """
+    stat = os.stat(path)
+    if previous is not None and previous["mtime"] == stat.st_mtime_ns and previous["size"] == stat.st_size:
+        return previous
+    return {"mtime": stat.st_mtime_ns, "size": stat.st_size, "hash": content_hash(path)}
+
+
+def load_manifest(index_path):
+    try:
+        with open(os.path.join(index_path, MANIFEST_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _replace_file(path, text):
+    # Write then rename, so readers see either the old or the new file. The temporary name is
+    # per process, so concurrent writers never write into each other's file.
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(temp_path, path)
+
+
+def save_manifest(index_path, manifest):
+    _replace_file(os.path.join(index_path, MANIFEST_FILE), json.dumps(manifest))
+
+
+@contextmanager
+def publish_lock(index_path):
+    """
+    Hold the index directory's publish lock, so one process at a time switches its generation.
+    """
+    path = os.path.join(index_path, LOCK_FILE)
+    while True:
+        try:
+            os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(path) > LOCK_TIMEOUT:
+                    os.remove(path)
+                    continue
+            except OSError:
+                continue  # Released meanwhile
+            time.sleep(0.01)
+    try:
+        yield
+    finally:
+        os.remove(path)
+
+
+def current_generation(index_path):
+    """
+    Return the published generation number, or None if nothing has been published.
+    """
+    try:
+        with open(os.path.join(index_path, GENERATION_FILE), "r", encoding="utf-8") as f:
+            return int(f.read())
+    except (OSError, ValueError):
+        manifest = load_manifest(index_path)
+        return manifest["generation"] if manifest else None
+
+
+def segment_paths(index_path, generation):
+    generation_path = os.path.join(index_path, str(generation))
+    return os.path.join(generation_path, "title"), os.path.join(generation_path, "content")
+
+
+def diff_files(indexed, files):
+    """
+    Compare the manifest's files with the (title, path) list on disk.
+    Returns (new manifest entries, added files, modified files, deleted paths).
+    """
+    entries = {}
+    added = []
+    modified = []
+    for title, path in files:
+        previous = indexed.get(path)
+        entry = entries[path] = file_entry(path, previous)
+        if previous is None:
+            added.append((title, path))
+        elif entry["hash"] != previous["hash"]:
+            modified.append((title, path))
+    deleted = [path for path in indexed if path not in entries]
+    return entries, added, modified, deleted
+
+
+def publish(index_path, manifest, files, title_index, content_index):
+    """
+    Save both indexes as a new generation, switch the manifest to it and drop older generations.
+    Returns the published generation, or a newer one another process published meanwhile.
+
+    The segments are written to a directory of this process's own and renamed into place, which
+    claims the generation number: files another process has published (and may have mapped) are
+    never rewritten, and two writers never publish the same number.
+    """
+    # Numbers are never reused (even when the manifest was lost), so a reader never opens a
+    # generation directory that was replaced under the same name
+    generation = max(manifest["generation"] if manifest else 0, current_generation(index_path) or 0) + 1
+    temp_path = os.path.join(index_path, f"{generation}.{os.getpid()}.tmp")
+    shutil.rmtree(temp_path, ignore_errors=True)
+    title_index.save(os.path.join(temp_path, "title"))
+    content_index.save(os.path.join(temp_path, "content"))
+    while True:
+        generation_path = os.path.join(index_path, str(generation))
+        try:
+            os.rename(temp_path, generation_path)
+            break
+        except OSError:
+            if not os.path.exists(generation_path):
+                raise
+            generation += 1  # Claimed by another writer
+
+    with publish_lock(index_path):
+        published = current_generation(index_path)
+        if published is not None and published > generation:
+            # A newer generation won the race; ours was never visible
+            shutil.rmtree(generation_path, ignore_errors=True)
+            return published
+        save_manifest(index_path, {"generation": generation, "files": files})
+        _replace_file(os.path.join(index_path, GENERATION_FILE), str(generation))
+
+        # Older generations may still be mapped by another reader (Windows refuses to delete them); retry next time.
+        # Newer ones are still being claimed by other writers and are theirs to publish or drop.
+        for name in os.listdir(index_path):
+            if name.isdigit() and int(name) < generation:
+                shutil.rmtree(os.path.join(index_path, name), ignore_errors=True)
+    return generation
+
+
+def update_indexes(base_path, index_path, analyzer, indexer_class, rebuild):
+    """
+    Bring the saved title/content segments up to date with base_path and open them (see
+    _update_indexes). Starts over when another process publishes a generation meanwhile and
+    removes the one being read.
+    """
+    while True:
+        published = current_generation(index_path)
+        try:
+            return _update_indexes(base_path, index_path, analyzer, indexer_class, rebuild)
+        except (OSError, ValueError):
+            if current_generation(index_path) == published:
+                raise
+
+
+def _update_indexes(base_path, index_path, analyzer, indexer_class, rebuild):
+    """
+    Bring the saved title/content segments up to date with base_path and open them.
+
+    Only files added or modified since the manifest was written are re-tokenized. Modified and
+    deleted files are tombstoned in the doc table; modified files are re-added under new doc IDs.
+    rebuild(base_path) -> (title_index, content_index) is used when there is no usable index yet
+    or too many tombstones have accumulated.
+    """
+    os.makedirs(index_path, exist_ok=True)
+    manifest = load_manifest(index_path)
+    files = list_documents(base_path)
+
+    if manifest is None or not all(segment_exists(path) for path in segment_paths(index_path, manifest["generation"])):
+        entries = {path: file_entry(path) for _, path in files}
+        title_index, content_index = rebuild(base_path)
+        generation = publish(index_path, manifest, entries, title_index, content_index)
+    else:
+        generation = manifest["generation"]
+        entries, added, modified, deleted = diff_files(manifest["files"], files)
+        if added or modified or deleted:
+            title_path, content_path = segment_paths(index_path, generation)
+            saved_title = indexer_class.load(title_path)
+            saved_content = indexer_class.load(content_path)
+            tombstones = len(saved_title.docs.deleted) + len(modified) + len(deleted)
+            slots = len(saved_title.docs) + len(added) + len(modified)
+
+            if tombstones > COMPACT_RATIO * slots:
+                saved_title.segment.close()
+                saved_content.segment.close()
+                title_index, content_index = rebuild(base_path)
+                generation = publish(index_path, manifest, entries, title_index, content_index)
+            else:
+                # Patch: tombstone changed files and append the re-tokenized ones. Only the postings of
+                # terms in those files are decoded; the others are copied into the new segments as encoded.
+                docs = DocTable(saved_title.docs.paths, saved_title.docs.deleted)
+                title_index = saved_title.patch(docs)
+                content_index = saved_content.patch(docs)
+                for path in deleted:
+                    docs.delete(path)
+                for _, path in modified:
+                    docs.delete(path)
+                try:
+                    merge_shards(docs, title_index, content_index, [index_shard(added + modified, analyzer)])
+                    generation = publish(index_path, manifest, entries, title_index, content_index)
+                finally:
+                    saved_title.segment.close()
+                    saved_content.segment.close()
+        elif entries != manifest["files"]:
+            # Files were touched without changing content; remember the new mtimes
+            with publish_lock(index_path):
+                if current_generation(index_path) == generation:
+                    save_manifest(index_path, {"generation": generation, "files": entries})
+
+    title_path, content_path = segment_paths(index_path, generation)
+    title_index, content_index = indexer_class.load(title_path), indexer_class.load(content_path)
+    title_index.generation = content_index.generation = generation
+    return title_index, content_index
@@ -0,0 +1,65 @@
+import numpy as np
+from scipy.special import expit as sigmoid
+
+from analysis import term_analyzer
+
+
+def compute_relevance_score(X1, X2):
+    # Neural network weights and biases
+    W_input1, W_input2 = 0.8, 0.6
+    B_input = 0.2
+    W_output = 1.5
+    B_output = -0.4
+
+    # Hidden layer calculation
+    H_input = W_input1 * X1 + W_input2 * X2 + B_input
+    H = sigmoid(H_input)
+
+    # Output layer calculation
+    relevance_score = W_output * H + B_output
+    return relevance_score
+
+# Words counted by each input feature
+FEATURE_WORDS = (("binary", "queue"), ("hashing", "stack", "binary"))
+
+def preprocess_query(query):
+    # A very simple preprocessing example: the share of words in each feature's word list
+    words = term_analyzer.terms(query)
+    if not words:
+        return 0.0, 0.0
+    counts = {}
+    for word in words:
+        counts[word] = counts.get(word, 0) + 1
+    X1, X2 = (sum(counts.get(word, 0) for word in feature) / len(words) for feature in FEATURE_WORDS)
+    return X1, X2
+
+# Precompute document features once (a documents x features matrix), scaled per column to [0, 1]
+def build_feature_matrix(documents):
+    paths = []
+    features = []
+    for doc in documents:
+        paths.append(doc["path"])
+        features.append(preprocess_query(doc["content"]))
+    matrix = np.array(features, dtype=np.float64).reshape(len(features), len(FEATURE_WORDS))
+    column_max = matrix.max(axis=0, initial=0)
+    matrix = np.divide(matrix, column_max, out=np.zeros_like(matrix), where=column_max > 0)
+    return paths, matrix
+
+def score_documents(query_features, doc_features):
+    """
+    Score every document in one pass: each input is the query feature times the document's feature.
+    """
+    inputs = doc_features * np.asarray(query_features)
+    return compute_relevance_score(inputs[:, 0], inputs[:, 1])
+
+def top_k_documents(scores, k):
+    """
+    Return the indices of the k highest scores, best first (ties by document order).
+    """
+    if k < len(scores):
+        candidates = np.argpartition(-scores, k - 1)[:k]
+        # Widen to every document tied with the k-th score so ties break by document order
+        candidates = np.flatnonzero(scores >= scores[candidates].min())
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.lexsort((candidates, -scores[candidates]))][:k]
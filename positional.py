@@ -0,0 +1,209 @@
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+
+from analysis import normalize, term_analyzer
+from boolean_query import intersect
+from indexer import DocTable
+from postings_codec import decode_varint, encode_varint
+
+# Query syntax: "quoted words" match as a phrase, a NEAR/k b matches a and b at most k tokens apart
+QUERY_TOKEN = re.compile(r'"[^"]*"|\S+')
+NEAR_OPERATOR = re.compile(r"near/(\d+)$", re.IGNORECASE)
+
+# Whitespace-separated words, as str.split() finds them
+WORD = re.compile(r"\S+")
+
+
+def tokenize(text):
+    """
+    Lowercased, punctuation-stripped tokens; a token's position is its index in this list.
+    """
+    return term_analyzer.terms(text)
+
+
+def token_spans(text):
+    """
+    (start, end) character offsets in text of each token of tokenize(text), by position.
+    """
+    matches = list(WORD.finditer(text))
+    return [match.span() for match, token in zip(matches, normalize(match.group() for match in matches)) if token]
+
+
+# One term's postings: delta-encoded doc IDs, and per document its delta-encoded positions as varints
+class PositionalPostings:
+    def __init__(self):
+        self.gaps = array("I")
+        self.offsets = array("I")  # start of each document's run in positions
+        self.positions = bytearray()  # per document: varint count, then varint position gaps
+        self.last = 0
+
+    def append(self, doc_id, positions):
+        if len(self.gaps) and doc_id <= self.last:
+            raise ValueError(f"postings must be appended in increasing doc-ID order ({doc_id} <= {self.last})")
+        self.gaps.append(doc_id - self.last if len(self.gaps) else doc_id)
+        self.last = doc_id
+        self.offsets.append(len(self.positions))
+        encode_varint(len(positions), self.positions)
+        previous = 0
+        for position in positions:
+            encode_varint(position - previous, self.positions)
+            previous = position
+
+    def doc_ids(self):
+        return list(accumulate(self.gaps))
+
+    def positions_at(self, i):
+        """
+        Decode the positions of the i-th document in this posting list.
+        """
+        count, pos = decode_varint(self.positions, self.offsets[i])
+        result = []
+        position = 0
+        for _ in range(count):
+            gap, pos = decode_varint(self.positions, pos)
+            position += gap
+            result.append(position)
+        return result
+
+    def __len__(self):
+        return len(self.gaps)
+
+
+# Inverted index with token offsets per posting, for phrase and proximity queries
+class PositionalIndex:
+    def __init__(self, docs=None):
+        self.docs = docs if docs is not None else DocTable()
+        self.index = {}  # term -> PositionalPostings
+
+    def add_document(self, doc_path, tokens):
+        doc_id = self.docs.add(doc_path)
+        positions = {}
+        for position, token in enumerate(tokens):
+            positions.setdefault(token, []).append(position)
+        for term, term_positions in positions.items():
+            postings = self.index.get(term)
+            if postings is None:
+                postings = self.index[term] = PositionalPostings()
+            postings.append(doc_id, term_positions)
+        return doc_id
+
+    def doc_ids(self, term):
+        postings = self.index.get(term)
+        return postings.doc_ids() if postings is not None else []
+
+    def doc_positions(self, term, doc_ids):
+        """
+        Return {doc ID: positions} of a term for the given sorted doc IDs (which must contain the term).
+        """
+        postings = self.index[term]
+        ids = postings.doc_ids()
+        result = {}
+        i = 0
+        for doc_id in doc_ids:
+            while ids[i] < doc_id:
+                i += 1
+            result[doc_id] = postings.positions_at(i)
+        return result
+
+    def positions(self, term, doc_id):
+        """
+        Return the positions of a term in one document ([] if it does not occur there).
+        """
+        postings = self.index.get(term)
+        if postings is None:
+            return []
+        ids = postings.doc_ids()
+        i = bisect_left(ids, doc_id)
+        return postings.positions_at(i) if i < len(ids) and ids[i] == doc_id else []
+
+    def _common_docs(self, terms):
+        # Intersect rarest first; positions are only decoded for documents holding every term
+        lists = sorted((self.doc_ids(term) for term in set(terms)), key=len)
+        common = lists[0] if lists else []
+        for doc_ids in lists[1:]:
+            if not common:
+                break
+            common = intersect(common, doc_ids)
+        return common
+
+    def phrase_starts(self, terms, candidates=None):
+        """
+        Return {doc ID: sorted start positions} for documents containing terms as consecutive tokens.
+        Only candidates are checked, if given (sorted doc IDs).
+        """
+        common = self._common_docs(terms)
+        if candidates is not None:
+            common = intersect(common, candidates)
+        if not terms or not common:
+            return {}
+        positions = {term: self.doc_positions(term, common) for term in set(terms)}
+        result = {}
+        for doc_id in common:
+            starts = set(positions[terms[0]][doc_id])
+            for offset, term in enumerate(terms[1:], 1):
+                starts &= {position - offset for position in positions[term][doc_id]}
+                if not starts:
+                    break
+            if starts:
+                result[doc_id] = sorted(starts)
+        return result
+
+    def phrase(self, terms):
+        """
+        Return the sorted doc IDs containing terms as consecutive tokens.
+        """
+        if len(terms) == 1:
+            return self.doc_ids(terms[0])  # No positions needed
+        return sorted(self.phrase_starts(terms))
+
+    def near(self, left, right, k):
+        """
+        Return the sorted doc IDs where an occurrence of the left phrase and of the right phrase
+        (lists of terms) are at most k tokens apart, in either order.
+        """
+        candidates = self._common_docs(left + right)
+        if not left or not right or not candidates:
+            return []
+        left_starts = self.phrase_starts(left, candidates)
+        right_starts = self.phrase_starts(right, candidates)
+        result = []
+        for doc_id in candidates:
+            if doc_id in left_starts and doc_id in right_starts:
+                lefts, rights = left_starts[doc_id], right_starts[doc_id]
+                if (within([start + len(left) - 1 for start in lefts], rights, k)
+                        or within([start + len(right) - 1 for start in rights], lefts, k)):
+                    result.append(doc_id)
+        return result
+
+    def search(self, query):
+        """
+        Evaluate a proximity query: quoted phrases, a NEAR/k b (either side may be a phrase) and
+        single terms. Clauses are OR'ed. Returns sorted doc IDs.
+        """
+        clauses = [clause[1:-1] if clause.startswith('"') else clause for clause in QUERY_TOKEN.findall(query)]
+        matched = set()
+        i = 0
+        while i < len(clauses):
+            operator = NEAR_OPERATOR.match(clauses[i + 1]) if i + 2 < len(clauses) else None
+            if operator:
+                matched.update(self.near(tokenize(clauses[i]), tokenize(clauses[i + 2]), int(operator.group(1))))
+                i += 3
+            else:
+                terms = tokenize(clauses[i])
+                if terms:
+                    matched.update(self.phrase(terms))
+                i += 1
+        return sorted(matched)
+
+
+def within(ends, starts, k):
+    """
+    True if some start follows some end by 1..k tokens (ends and starts sorted).
+    """
+    for end in ends:
+        i = bisect_right(starts, end)
+        if i < len(starts) and starts[i] - end <= k:
+            return True
+    return False
@@ -0,0 +1,387 @@
+import sys
+import time
+import random
+import struct
+from functools import lru_cache
+from array import array
+from bisect import bisect_left
+from itertools import accumulate
+import numpy as np
+
+# Postings are cut into blocks of BLOCK_SIZE postings. Each term's postings start with a skip table,
+# one SKIP_ENTRY per block (last doc ID in the block, byte offset of the block after the table,
+# largest freq / doc length in the block), followed by the blocks: encoded doc-ID gaps, then
+# encoded term frequencies. Single-block lists (most terms) have no skip table. The first gap of a block is relative to the previous block's last
+# doc ID, so any block can be decoded on its own and the gaps of all blocks concatenate to the
+# gaps of the whole list.
+BLOCK_SIZE = 128
+SKIP_ENTRY = struct.Struct("<IId")
+WORD = struct.Struct("<Q")
+
+
+# Unsigned LEB128 varints: 7 bits per byte, high bit set on every byte but the last
+def encode_varint(value, out):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def decode_varint(data, pos):
+    """
+    Return (value, position after it).
+    """
+    value = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def to_array(values):
+    """
+    Copy a NumPy array of uint32 to an array('I').
+    """
+    result = array("I")
+    result.frombytes(np.ascontiguousarray(values, dtype=np.uint32).tobytes())
+    return result
+
+
+def pack_bits(values, width, out):
+    """
+    Append values (each below 2**width) to out as width-bit fields, least significant bit first.
+    """
+    if width:
+        values = np.asarray(values, dtype=np.uint32).astype("<u4")
+        bits = np.unpackbits(values.view(np.uint8).reshape(-1, 4), axis=1, bitorder="little")[:, :width]
+        out += np.packbits(bits, bitorder="little").tobytes()
+
+
+@lru_cache(maxsize=None)
+def _field_windows(count, width):
+    # For each field: the indices of the 8 bytes holding it, and its bit shift within them
+    offsets = np.arange(count, dtype=np.int64) * width
+    return (offsets >> 3)[:, None] + np.arange(8), (offsets & 7).astype(np.uint64)
+
+
+def unpack_bits(data, pos, count, width):
+    """
+    Return (count width-bit fields read from data at pos as an array of uint32, position after them).
+    """
+    if not width:
+        return np.zeros(count, dtype=np.uint32), pos
+    size = (count * width + 7) // 8
+    padded = np.zeros(size + 8, dtype=np.uint8)
+    padded[:size] = np.frombuffer(data, np.uint8, size, pos)
+    windows, shifts = _field_windows(count, width)
+    words = padded[windows].view("<u8").ravel()
+    return ((words >> shifts) & np.uint64((1 << width) - 1)).astype(np.uint32), pos + size
+
+
+# Codecs encode one block of unsigned 32-bit ints; encode(values, out) appends to a bytearray
+# and decode(data, pos, count) returns (count values as a NumPy uint32 array, position after them).
+
+# Fixed-width little-endian uint32, the uncompressed layout
+class Uint32Codec:
+    name = "uint32"
+
+    def encode(self, values, out):
+        out += np.asarray(values, dtype="<u4").tobytes()
+
+    def decode(self, data, pos, count):
+        return np.frombuffer(data, "<u4", count, pos).astype(np.uint32), pos + 4 * count
+
+
+# One LEB128 varint per value: small gaps take one byte
+class VarintCodec:
+    name = "varint"
+
+    def encode(self, values, out):
+        for value in values:
+            encode_varint(value, out)
+
+    def decode(self, data, pos, count):
+        values = []
+        for _ in range(count):
+            value, pos = decode_varint(data, pos)
+            values.append(value)
+        return np.array(values, dtype=np.uint32), pos
+
+
+# Simple-8b: 64-bit words, a 4-bit selector and as many equal-width values as fit in 60 bits.
+# Selectors 0 and 1 are runs of 240 and 120 ones (the most common gap and term frequency).
+class Simple8bCodec:
+    name = "simple8b"
+    LAYOUTS = ((240, 0), (120, 0), (60, 1), (30, 2), (20, 3), (15, 4), (12, 5), (10, 6), (8, 7), (7, 8),
+               (6, 10), (5, 12), (4, 15), (3, 20), (2, 30), (1, 60))
+
+    def encode(self, values, out):
+        values = list(values)
+        pos = 0
+        while pos < len(values):
+            for selector, (count, width) in enumerate(self.LAYOUTS):
+                chunk = values[pos:pos + count]
+                if width == 0:
+                    if len(chunk) < count or any(value != 1 for value in chunk):
+                        continue
+                    word = 0
+                elif len(chunk) < count or max(chunk) >> width:
+                    continue  # Only full words, so the decoder never reads past the block
+                else:
+                    word = 0
+                    for i, value in enumerate(chunk):
+                        word |= value << (i * width)
+                out += WORD.pack(selector << 60 | word)
+                pos += count
+                break
+
+    def decode(self, data, pos, count):
+        values = []
+        while len(values) < count:
+            word = WORD.unpack_from(data, pos)[0]
+            pos += WORD.size
+            n, width = self.LAYOUTS[word >> 60]
+            if width == 0:
+                values.extend([1] * n)
+            else:
+                mask = (1 << width) - 1
+                values.extend([(word >> (i * width)) & mask for i in range(n)])
+        return np.array(values, dtype=np.uint32), pos
+
+
+# Every value in width bits, the width of the block's largest value (one byte header)
+class BitPackCodec:
+    name = "bitpack"
+
+    def encode(self, values, out):
+        width = max(values, default=0).bit_length()
+        out.append(width)
+        pack_bits(values, width, out)
+
+    def decode(self, data, pos, count):
+        return unpack_bits(data, pos + 1, count, data[pos])
+
+
+# PForDelta: bit-pack the low bits of every value at a width most values fit in; the rest are
+# exceptions stored after the block as (position, high bits) varints and patched in on decode
+class PForDeltaCodec:
+    name = "pfordelta"
+
+    def __init__(self, fit=0.9):
+        self.fit = fit  # share of values stored without an exception
+
+    def encode(self, values, out):
+        values = list(values)
+        widths = sorted(value.bit_length() for value in values)
+        width = widths[min(int(len(widths) * self.fit), len(widths) - 1)] if widths else 0
+        mask = (1 << width) - 1
+        exceptions = [(i, value >> width) for i, value in enumerate(values) if value >> width]
+        out.append(width)
+        pack_bits([value & mask for value in values], width, out)
+        encode_varint(len(exceptions), out)
+        for i, high in exceptions:
+            encode_varint(i, out)
+            encode_varint(high, out)
+
+    def decode(self, data, pos, count):
+        width = data[pos]
+        values, pos = unpack_bits(data, pos + 1, count, width)
+        exceptions, pos = decode_varint(data, pos)
+        for _ in range(exceptions):
+            i, pos = decode_varint(data, pos)
+            high, pos = decode_varint(data, pos)
+            values[i] |= high << width
+        return values, pos
+
+
+CODECS = {codec.name: codec for codec in (Uint32Codec(), VarintCodec(), Simple8bCodec(), BitPackCodec(), PForDeltaCodec())}
+CODEC_IDS = {name: codec_id for codec_id, name in enumerate(CODECS)}  # Stored in the segment header
+CODEC_NAMES = list(CODECS)
+
+# Codec for new segments; see the benchmark below
+DEFAULT_CODEC = "bitpack"
+
+
+def encode_postings(gaps, freqs, doc_lengths, codec, out):
+    """
+    Append one term's skip table and blocks to out; returns the largest freq / doc length.
+    """
+    blocks = bytearray()
+    skips = []
+    last = 0
+    for start in range(0, len(gaps), BLOCK_SIZE):
+        block_gaps = gaps[start:start + BLOCK_SIZE]
+        block_freqs = freqs[start:start + BLOCK_SIZE]
+        doc_ids = list(accumulate(block_gaps, initial=last))[1:]
+        last = doc_ids[-1]
+        max_tf = max((freq / doc_lengths[doc_id] for doc_id, freq in zip(doc_ids, block_freqs)
+                      if doc_id < len(doc_lengths) and doc_lengths[doc_id]), default=0.0)
+        skips.append(SKIP_ENTRY.pack(last, len(blocks), max_tf))
+        codec.encode(block_gaps, blocks)
+        codec.encode(block_freqs, blocks)
+    if len(skips) > 1:
+        for skip in skips:
+            out += skip
+    out += blocks
+    return max((SKIP_ENTRY.unpack(skip)[2] for skip in skips), default=0.0)
+
+
+# One term's block-encoded postings, decoded a block at a time
+class BlockPostings:
+    def __init__(self, data, start, doc_freq, codec, max_tf=None, end=None):
+        self.data = data
+        self.start = start
+        self.end = end  # End of the encoded postings in data, when known
+        self.doc_freq = doc_freq
+        self.codec = codec
+        self.max_tf = max_tf
+        self.block_count = -(-doc_freq // BLOCK_SIZE)
+        self.blocks_start = start + (self.block_count * SKIP_ENTRY.size if self.block_count > 1 else 0)
+        self._skips = None
+        self._decoded = None
+
+    @property
+    def skips(self):
+        """
+        (last doc ID, block offset, max freq / doc length) for each block.
+        """
+        if self._skips is None:
+            if self.block_count > 1:
+                self._skips = list(SKIP_ENTRY.iter_unpack(self.data[self.start:self.blocks_start]))
+            elif self.block_count:
+                self._skips = [(sum(self.gaps), 0, self.max_tf or 0.0)]
+            else:
+                self._skips = []
+        return self._skips
+
+    def block_ends(self):
+        return [last for last, _, _ in self.skips]
+
+    def block_max_tfs(self):
+        return [max_tf for _, _, max_tf in self.skips]
+
+    def block(self, i):
+        """
+        Return (doc IDs, term frequencies) of block i.
+        """
+        count = min(BLOCK_SIZE, self.doc_freq - i * BLOCK_SIZE)
+        pos = self.blocks_start + self.skips[i][1]
+        gaps, pos = self.codec.decode(self.data, pos, count)
+        freqs, _ = self.codec.decode(self.data, pos, count)
+        base = self.skips[i - 1][0] if i else 0
+        return (np.cumsum(gaps, dtype=np.int64) + base).tolist(), freqs.tolist()
+
+    def decode(self):
+        """
+        Return (gaps, term frequencies) of the whole list as array('I')s, decoding each block once.
+        """
+        if self._decoded is None:
+            gaps = []
+            freqs = []
+            pos = self.blocks_start
+            for i in range(self.block_count):
+                count = min(BLOCK_SIZE, self.doc_freq - i * BLOCK_SIZE)
+                block_gaps, pos = self.codec.decode(self.data, pos, count)
+                block_freqs, pos = self.codec.decode(self.data, pos, count)
+                gaps.append(block_gaps)
+                freqs.append(block_freqs)
+            self._decoded = (to_array(np.concatenate(gaps)) if gaps else array("I"),
+                             to_array(np.concatenate(freqs)) if freqs else array("I"))
+        return self._decoded
+
+    @property
+    def gaps(self):
+        return self.decode()[0]
+
+    @property
+    def freqs(self):
+        return self.decode()[1]
+
+    def doc_ids(self):
+        return list(accumulate(self.gaps))
+
+    def items(self):
+        return zip(accumulate(self.gaps), self.freqs)
+
+    def intersect(self, doc_ids):
+        """
+        Return the sorted doc_ids that are in these postings, decoding only the blocks they fall in.
+        """
+        ends = self.block_ends()
+        result = []
+        current = -1
+        block = []
+        for doc_id in doc_ids:
+            i = bisect_left(ends, doc_id, max(current, 0))
+            if i == len(ends):
+                break
+            if i != current:
+                current = i
+                block = self.block(i)[0]
+            pos = bisect_left(block, doc_id)
+            if pos < len(block) and block[pos] == doc_id:
+                result.append(doc_id)
+        return result
+
+    def __len__(self):
+        return self.doc_freq
+
+
+def synthetic_postings(num_docs, doc_freq, seed=0):
+    """
+    (gaps, freqs, doc lengths) of a term in doc_freq random documents out of num_docs, with
+    geometric term frequencies, for the benchmark.
+    """
+    rng = random.Random(seed)
+    doc_ids = sorted(rng.sample(range(num_docs), doc_freq))
+    gaps = [doc_ids[0]] + [b - a for a, b in zip(doc_ids, doc_ids[1:])]
+    freqs = [1 + int(rng.expovariate(0.7)) for _ in doc_ids]
+    doc_lengths = [100 + rng.randrange(900) for _ in range(num_docs)]
+    return gaps, freqs, doc_lengths
+
+
+def benchmark(codec, postings, repeat=3):
+    """
+    Return (bytes per posting, decoded postings per second) for a codec over a list of
+    (gaps, freqs, doc lengths); the size includes skip tables, and the speed is the best of repeat runs.
+    """
+    encoded = []
+    for gaps, freqs, doc_lengths in postings:
+        out = bytearray()
+        encode_postings(gaps, freqs, doc_lengths, codec, out)
+        encoded.append((bytes(out), len(gaps)))
+    count = sum(doc_freq for _, doc_freq in encoded)
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for data, doc_freq in encoded:
+            BlockPostings(data, 0, doc_freq, codec).decode()
+        best = min(best, time.perf_counter() - start)
+    return sum(len(data) for data, _ in encoded) / count, count / best if best else float("inf")
+
+
+# Usage: python postings_codec.py [segment directory] [repeat]
+def main(argv):
+    repeat = int(argv[2]) if len(argv) > 2 else 3
+    if len(argv) > 1:
+        from indexer import InvertedIndexer
+        index = InvertedIndexer.load(argv[1])
+        lengths = index.doc_length_array()
+        postings = [(array("I", p.gaps), array("I", p.freqs), lengths) for _, p in index.index.items()]
+        source = f"{argv[1]}: {len(postings)} terms"
+    else:
+        postings = [synthetic_postings(100000, doc_freq, seed) for seed, doc_freq in
+                    enumerate((50, 500, 5000, 20000, 60000))]
+        source = "synthetic: 100000 documents, doc freqs 50 to 60000"
+    print(f"{source}, {sum(len(gaps) for gaps, _, _ in postings)} postings")
+    for name, codec in CODECS.items():
+        size, speed = benchmark(codec, postings, repeat)
+        print(f"{name:>10}: {size:6.2f} bytes/posting, {speed / 1e6:7.2f} M postings/s decoded")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,89 @@
+import time
+import threading
+from collections import OrderedDict
+
+# Defaults: entries kept, and seconds an entry stays valid
+MAX_ENTRIES = 256
+TTL_SECONDS = 600
+
+
+def cache_key(query, model, **options):
+    """
+    Key a query by its whitespace-normalized text, the model and its options. Callers whose
+    models ignore case pass the query lowercased.
+    """
+    return " ".join(query.split()), model, tuple(sorted(options.items()))
+
+
+def summarize(stats):
+    """
+    One-line summary of QueryCache.stats(), for display.
+    """
+    return (f"Query cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.0%} hit rate), "
+            f"{stats['entries']}/{stats['max_entries']} entries, {stats['evictions']} evicted")
+
+
+# Bounded LRU cache of query results with a TTL, shared by every session of an app
+class QueryCache:
+    def __init__(self, max_entries=MAX_ENTRIES, ttl=TTL_SECONDS, clock=time.monotonic):
+        """
+        Entries remember the index generation they were computed against and are dropped
+        when looked up against a different one, so re-indexing invalidates them.
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self.entries = OrderedDict()  # key -> (generation, expiry time, value), least recently used first
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()  # Streamlit runs sessions on separate threads
+
+    def get(self, key, generation, default=None):
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                entry_generation, expires, value = entry
+                if entry_generation == generation and self.clock() < expires:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self.entries[key]
+                self.evictions += 1
+            self.misses += 1
+            return default
+
+    def put(self, key, generation, value):
+        with self._lock:
+            self.entries[key] = (generation, self.clock() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key, generation, compute):
+        """
+        Return the cached value for key, or compute() it and cache it. Exceptions are not cached.
+        """
+        missing = object()
+        value = self.get(key, generation, missing)
+        if value is missing:
+            value = compute()
+            self.put(key, generation, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"entries": len(self.entries), "max_entries": self.max_entries, "hits": self.hits, "misses": self.misses,
+                    "evictions": self.evictions, "hit_rate": self.hits / lookups if lookups else 0.0}
+
+    def summary(self):
+        return summarize(self.stats())
+
+    def __len__(self):
+        return len(self.entries)
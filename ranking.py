@@ -0,0 +1,105 @@
+import math
+
+from bm25 import BM25Index
+from boolean_query import QueryPlanner, parse_query, positive_terms
+from analysis import keyword_analyzer
+from topk import tf_cursor, top_k_by_key, wand_top_k
+
+
+# Query terms for keyword ranking, analyzed as the keyword index analyzes documents
+def keyword_terms(query):
+    return keyword_analyzer.terms(query)
+
+
+# Query terms of a Boolean query: every term not under a NOT (NOT terms are excluded from scoring)
+def boolean_terms(query):
+    return positive_terms(parse_query(query, keyword_analyzer))
+
+
+# Documents with an indexed term containing the query (partial matches via the term dictionary)
+def substring_search(index, query):
+    results = set()
+    for term in index.term_dictionary().substring(query.lower()):
+        results.update(index.doc_ids(term))
+    return [index.docs.path(doc_id) for doc_id in sorted(results)]
+
+
+# Documents with the query as a whole term
+def term_search(index, query):
+    return index.paths(query.lower())
+
+
+# Documents containing any of the query terms
+def keyword_search(index, query_terms):
+    results = set()
+    for term in query_terms:
+        results.update(index.doc_ids(term))
+    return [index.docs.path(doc_id) for doc_id in sorted(results)]
+
+
+# Helper function to rank documents by keyword matches (keeping only the top k when k is given)
+def sort_by_keyword_matches(documents, query_terms, k=None):
+    def count_keyword_matches(doc_path):
+        return sum(1 for term in query_terms if term in doc_path.lower())
+
+    if k is not None:
+        return top_k_by_key(documents, k, count_keyword_matches)
+    return sorted(documents, key=count_keyword_matches, reverse=True)
+
+
+# Evaluate a query tree over the sorted postings; returns the matching document paths
+def apply_boolean_logic(query_tree, content_index):
+    doc_ids = QueryPlanner(content_index).evaluate(query_tree)
+    return [content_index.docs.path(doc_id) for doc_id in doc_ids]
+
+
+# IDF of each query term from the collection's live document count and a term -> document frequency function
+def inverse_document_frequencies(query_terms, num_docs, doc_freq):
+    return {term: math.log((1 + num_docs) / (1 + doc_freq(term))) + 1 for term in query_terms}  # Add 1 to avoid division by zero
+
+
+# TF-IDF calculation over the postings of the query terms; with k, only the top k are returned
+def calculate_tf_idf(query_terms, content_index, k=None):
+    idf = inverse_document_frequencies(query_terms, content_index.docs.live_count(), content_index.doc_freq)
+    return [(content_index.docs.path(doc_id), score) for doc_id, score in tf_idf_scores(query_terms, content_index, idf, k)]
+
+
+def tf_idf_scores(query_terms, content_index, idf, k=None):
+    """
+    Return (doc ID, score) pairs with positive score, best first (ties by doc ID), given each
+    term's IDF; the top k only when k is given.
+    """
+    # Top k only: WAND skips documents whose term upper bounds cannot beat the k-th score
+    if k is not None:
+        cursors = [tf_cursor(content_index, term, idf[term], surface=True) for term in query_terms]
+        return wand_top_k(cursors, k)
+
+    # Collect TF from the stored surface-form counts (what content.split().count(term) gave) and document lengths
+    tf = {}  # doc ID -> {term: tf}
+    for term in query_terms:
+        for doc_id, freq in content_index.surface_postings(term):
+            doc_length = content_index.doc_length(doc_id)
+            tf.setdefault(doc_id, {})[term] = freq / doc_length if doc_length else 0
+
+    # Only documents containing a query term can score above zero
+    scores = []
+    for doc_id in sorted(tf):
+        score = sum(tf[doc_id].get(term, 0) * idf[term] for term in query_terms)
+        if score > 0:
+            scores.append((doc_id, score))
+
+    return sorted(scores, key=get_score, reverse=True)  # Return ranked documents
+
+
+# BM25 ranking (BM25+ when delta > 0), accumulated over the query terms' postings with NumPy;
+# callers ranking many queries pass the BM25Index they keep for the index (built with the same delta)
+def calculate_bm25(query_terms, content_index, k=None, delta=0.0, bm25=None):
+    if bm25 is None:
+        bm25 = BM25Index(content_index, delta=delta)
+    k = k if k is not None else len(content_index.docs)
+    return [(content_index.docs.path(doc_id), score) for doc_id, score in bm25.top_k(query_terms, k)]
+
+
+# Helper function for sorting by score
+def get_score(item):
+    return item[1]
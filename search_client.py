@@ -0,0 +1,61 @@
+import os
+import json
+import urllib.error
+import urllib.request
+
+from query_cache import summarize
+from search_engine import open_engine
+
+# Environment variable with the URL of a running search_server.py, e.g. http://127.0.0.1:8765
+SERVER_URL_VARIABLE = "SEARCH_SERVER_URL"
+
+# Seconds to wait for the server
+TIMEOUT = 60
+
+
+# Client for search_server.py with the same methods as SearchEngine
+class SearchClient:
+    def __init__(self, url, timeout=TIMEOUT):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def _request(self, path, payload=None):
+        data = None if payload is None else json.dumps(payload).encode("utf-8")
+        request = urllib.request.Request(self.url + path, data=data, headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.load(response)
+        except urllib.error.HTTPError as e:
+            if e.code == 400:
+                raise ValueError(json.load(e).get("error", e.reason)) from None
+            raise
+
+    def search(self, model, query, k=None, snippets=False, **options):
+        """
+        Raises ValueError when the server rejects the request (unknown model, bad option, malformed query).
+        """
+        return self._request("/search", {"model": model, "query": query, "k": k, "snippets": snippets,
+                                         "options": options})
+
+    def search_batch(self, requests):
+        return self._request("/search", {"requests": requests})["responses"]
+
+    def models(self):
+        return self._request("/models")
+
+    def stats(self):
+        return self._request("/stats")
+
+
+def connect(base_path, url=None):
+    """
+    Return a SearchClient for url (default: $SEARCH_SERVER_URL), or without one the
+    process-wide SearchEngine for base_path, so an app runs the same with or without a server.
+    """
+    url = url or os.environ.get(SERVER_URL_VARIABLE)
+    return SearchClient(url) if url else open_engine(base_path)
+
+
+def cache_summary(client, collection):
+    stats = client.stats().get(collection)
+    return summarize(stats) if stats else "Query cache: empty"
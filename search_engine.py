@@ -0,0 +1,487 @@
+import os
+import json
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+import numpy as np
+
+from corpus import build_indexes, keyword_analyzer, noun_analyzer, term_analyzer, word_analyzer
+from index_service import TERMS_INDEX_PATH, open_service
+from query_cache import cache_key
+from ranking import (apply_boolean_logic, boolean_terms, calculate_bm25, calculate_tf_idf, keyword_search,
+                     keyword_terms, sort_by_keyword_matches, substring_search, term_search)
+from boolean_query import OPERATORS, parse_query
+from bm25 import BM25Index
+from doc_store import open_doc_store
+from topk import PostingCursor, wand_top_k
+from positional import PositionalIndex, tokenize
+from doc_term_graph import DocTermGraph
+from weighted_index import WeightedIndex, normalize_query
+from vector_models import (process_boolean_extended_query, process_fuzzy_query, process_generalized_vector_query,
+                           process_lsi_query)
+from lsi import LSIModel
+from evidence import BeliefNetwork, EvidenceIndex, category_of
+from sharded_index import REPLICAS, open_shards
+from neural import build_feature_matrix, preprocess_query, score_documents, top_k_documents
+
+# Default documents folder, as in the apps
+BASE_PATH = "C:\\IR\\DataStructures"
+
+# Models derived from an index generation kept at once (each LSI rank is one)
+MAX_DERIVED = 8
+
+# Collection whose positional index and document store give result snippets
+SNIPPET_COLLECTION = "words"
+
+
+# Build the noun indexes and also save them to JSON, as Assignment1 and Assignment1b always have
+def build_noun_indexes(base_path):
+    title_index, content_index = build_indexes(base_path, noun_analyzer)
+
+    with open("title_index.json", "w") as title_file:
+        json.dump(title_index.to_dict(), title_file)
+
+    with open("content_index.json", "w") as content_file:
+        json.dump(content_index.to_dict(), content_file)
+
+    return title_index, content_index
+
+
+# Index collections: name -> (index directory, analyzer, rebuild function or None for the default)
+COLLECTIONS = {
+    "nouns": ("index", noun_analyzer, build_noun_indexes),  # Assignment1, Assignment1b
+    "ranked": (os.path.join("index", "ranked"), keyword_analyzer, None),  # a2, ass2
+    "words": (os.path.join("index", "words"), word_analyzer, None),  # assignment3
+    "terms": (TERMS_INDEX_PATH, term_analyzer, None),  # assignment4 to assignment7
+}
+
+
+def select_index(handle, search_by):
+    if search_by == "title":
+        return handle.title_index
+    if search_by == "content":
+        return handle.content_index
+    raise ValueError(f"search_by must be 'title' or 'content', not {search_by!r}")
+
+
+def query_terms(query, syntax):
+    if syntax == "keywords":
+        return keyword_terms(query)
+    if syntax == "boolean":
+        return boolean_terms(query)
+    raise ValueError(f"syntax must be 'keywords' or 'boolean', not {syntax!r}")
+
+
+# Models derived from one generation, built on first use (see SearchEngine.derived)
+def build_proximity_indexes(handle, store):
+    """
+    Positional index and graph of the live documents, tokenizing the text saved in the document
+    store, so positions always line up with the store's token spans even if a file changed since.
+    """
+    positional_index = PositionalIndex()  # Token offsets for phrase and NEAR/k queries
+    for path in handle.content_index.docs.live_paths():
+        positional_index.add_document(path, tokenize(store.document(store.doc_id(path))))
+    proximal_graph = DocTermGraph.from_index(positional_index)  # Doc-term adjacency read off the postings
+    return positional_index, proximal_graph
+
+
+def document_store(engine, handle):
+    return engine.derived(handle, "store", lambda handle: open_doc_store(handle.content_index))
+
+
+def proximity_indexes(engine, handle):
+    store = document_store(engine, handle)
+    return engine.derived(handle, "proximity", lambda handle: build_proximity_indexes(handle, store))
+
+
+# BM25Index per generation and delta, so document lengths and decoded postings are shared by every query
+def bm25_index(engine, handle, delta=0.0):
+    return engine.derived(handle, ("bm25", delta), lambda handle: BM25Index(handle.content_index, delta=delta))
+
+
+def build_belief_network(handle):
+    evidence_index = EvidenceIndex(handle.content_index)
+    return evidence_index, BeliefNetwork(evidence_index)
+
+
+def all_documents(handle):
+    return [doc for docs in handle.documents().values() for doc in docs]
+
+
+# Retrieval models: each takes (engine, handle, query, k, **options) and returns [(path, score)],
+# best first; score is None for models that only match.
+
+# Assignment1: documents with a term containing the query
+def rank_substring(engine, handle, query, k, search_by):
+    return [(path, None) for path in substring_search(select_index(handle, search_by), query)]
+
+
+# Assignment1b: documents with the query as a whole term
+def rank_term(engine, handle, query, k, search_by):
+    return [(path, None) for path in term_search(select_index(handle, search_by), query)]
+
+
+# ass2: documents with any query term, most matching terms in the path first
+def rank_keyword(engine, handle, query, k, search_by):
+    terms = keyword_terms(query)
+    if not terms:
+        return []
+    matched = keyword_search(select_index(handle, search_by), terms)
+    return [(path, None) for path in sort_by_keyword_matches(matched, terms, k)]
+
+
+# a2: Boolean query (AND, OR, NOT and parentheses) over the content index
+def rank_boolean(engine, handle, query, k):
+    query_tree = parse_query(query, keyword_analyzer)
+    if engine.shards:
+        with engine.sharded(handle) as shards:
+            return [(path, None) for path in shards.boolean(query_tree)]
+    return [(path, None) for path in apply_boolean_logic(query_tree, handle.content_index)]
+
+
+# a2/ass2 ranked models; with engine.shards they are scattered to the shard workers and score the same
+def rank_tf_idf(engine, handle, query, k, syntax):
+    if engine.shards:
+        with engine.sharded(handle) as shards:
+            return shards.tf_idf(query_terms(query, syntax), k)
+    return calculate_tf_idf(query_terms(query, syntax), handle.content_index, k)
+
+
+def rank_bm25(engine, handle, query, k, syntax):
+    if engine.shards:
+        with engine.sharded(handle) as shards:
+            return shards.bm25(query_terms(query, syntax), k)
+    return calculate_bm25(query_terms(query, syntax), handle.content_index, k, bm25=bm25_index(engine, handle))
+
+
+def rank_bm25_plus(engine, handle, query, k, syntax):
+    if engine.shards:
+        with engine.sharded(handle) as shards:
+            return shards.bm25(query_terms(query, syntax), k, delta=1.0)
+    return calculate_bm25(query_terms(query, syntax), handle.content_index, k, delta=1.0,
+                          bm25=bm25_index(engine, handle, delta=1.0))
+
+
+# assignment3: Binary Independence Model; each matching query term adds 1, so every term's upper bound is 1
+def rank_bim(engine, handle, query, k):
+    content_index = handle.content_index
+    cursors = [PostingCursor(content_index.doc_ids(term), lambda pos: 1, 1) for term in word_analyzer.terms(query)]
+    return [(content_index.docs.path(doc_id), score)
+            for doc_id, score in wand_top_k(cursors, k or len(content_index.docs))]
+
+
+# assignment3: union of the query terms' documents
+def rank_non_overlapped(engine, handle, query, k):
+    content_index = handle.content_index
+    doc_ids = set()
+    for term in word_analyzer.terms(query):
+        doc_ids.update(content_index.doc_ids(term))
+    return [(content_index.docs.path(doc_id), None) for doc_id in sorted(doc_ids)]
+
+
+# assignment3: "quoted phrases" and a NEAR/k b over the positional index
+def rank_proximal(engine, handle, query, k):
+    positional_index, _ = proximity_indexes(engine, handle)
+    return [(positional_index.docs.path(doc_id), None) for doc_id in positional_index.search(query)]
+
+
+# assignment3: one hop out from the proximal results through the doc-term graph; the score is the shared term count
+def rank_neighbors(engine, handle, query, k):
+    positional_index, proximal_graph = proximity_indexes(engine, handle)
+    relevant_docs = positional_index.search(query)
+    if not relevant_docs:
+        return []
+    return [(proximal_graph.paths[doc_id], shared) for doc_id, shared in proximal_graph.related_docs(relevant_docs, k or 10)]
+
+
+# assignment5: extended Boolean (p-norm); +terms are soft-AND'ed, -term excluded, other terms OR'ed
+def rank_extended_boolean(engine, handle, query, k, p):
+    if not np.isfinite(p) or p < 1:
+        raise ValueError("p must be a finite number of at least 1")
+    weighted_index = engine.derived(handle, "weighted", lambda handle: WeightedIndex(handle.content_index))
+    return process_boolean_extended_query(query, weighted_index, p)
+
+
+def rank_fuzzy(engine, handle, query, k):
+    weighted_index = engine.derived(handle, "weighted", lambda handle: WeightedIndex(handle.content_index))
+    return process_fuzzy_query(query, weighted_index)
+
+
+def rank_generalized_vector(engine, handle, query, k):
+    return process_generalized_vector_query(query, handle.content_index)
+
+
+def rank_lsi(engine, handle, query, k, rank):
+    if rank < 1:
+        raise ValueError("rank must be at least 1")
+    model = engine.derived(handle, ("lsi", rank), lambda handle: LSIModel(all_documents(handle), rank))
+    return process_lsi_query(query, model)
+
+
+# assignment6: two-input neural relevance model over the precomputed feature matrix
+def rank_neural(engine, handle, query, k):
+    paths, doc_features = engine.derived(handle, "features", lambda handle: build_feature_matrix(all_documents(handle)))
+    scores = score_documents(preprocess_query(query), doc_features)
+    return [(paths[i], scores[i]) for i in top_k_documents(scores, k or len(paths))]
+
+
+# assignment7: Inference Model; every document scores its category's share of documents with the query terms
+def rank_inference(engine, handle, query, k):
+    evidence_index, _ = engine.derived(handle, "belief", build_belief_network)
+    relevance_probs = evidence_index.relevance_probabilities(normalize_query(query))
+    ranked_categories = sorted(handle.documents().items(), key=lambda item: relevance_probs.get(item[0], 0), reverse=True)
+    return [(doc["path"], relevance_probs.get(category, 0)) for category, docs in ranked_categories for doc in docs]
+
+
+# assignment7: Belief Network; most probable document nodes first (ties keep document order)
+def rank_belief(engine, handle, query, k):
+    _, belief_network = engine.derived(handle, "belief", build_belief_network)
+    probs = belief_network.joint_probability(belief_network.document_evidence(normalize_query(query)))
+    docs = handle.content_index.docs
+    return [(docs.path(belief_network.doc_ids[i]), probs[i]) for i in np.argsort(-probs, kind="stable")]
+
+
+# Model name -> (collection, rank function, options with their defaults)
+MODELS = {
+    "substring": ("nouns", rank_substring, {"search_by": "content"}),
+    "term": ("nouns", rank_term, {"search_by": "content"}),
+    "keyword": ("ranked", rank_keyword, {"search_by": "content"}),
+    "boolean": ("ranked", rank_boolean, {}),
+    "tfidf": ("ranked", rank_tf_idf, {"syntax": "keywords"}),
+    "bm25": ("ranked", rank_bm25, {"syntax": "keywords"}),
+    "bm25+": ("ranked", rank_bm25_plus, {"syntax": "keywords"}),
+    "bim": ("words", rank_bim, {}),
+    "non_overlapped": ("words", rank_non_overlapped, {}),
+    "proximal": ("words", rank_proximal, {}),
+    "neighbors": ("words", rank_neighbors, {}),
+    "extended_boolean": ("terms", rank_extended_boolean, {"p": 2.0}),
+    "fuzzy": ("terms", rank_fuzzy, {}),
+    "generalized_vector": ("terms", rank_generalized_vector, {}),
+    "lsi": ("terms", rank_lsi, {"rank": 100}),
+    "neural": ("terms", rank_neural, {}),
+    "inference": ("terms", rank_inference, {}),
+    "belief": ("terms", rank_belief, {}),
+}
+
+
+def resolve_request(model, query, k=None, options=None):
+    """
+    Validate a request; returns (model, query, k, options with defaults filled in).
+    Raises ValueError describing the first problem.
+    """
+    if model not in MODELS:
+        raise ValueError(f"Unknown model {model!r}; expected one of {', '.join(MODELS)}")
+    if not isinstance(query, str):
+        raise ValueError("query must be a string")
+    if k is not None and (isinstance(k, bool) or not isinstance(k, int) or k < 1):
+        raise ValueError("k must be a positive integer")
+    defaults = MODELS[model][2]
+    resolved = dict(defaults)
+    for name, value in (options or {}).items():
+        if name not in defaults:
+            raise ValueError(f"Unknown option {name!r} for {model}")
+        try:
+            resolved[name] = type(defaults[name])(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"Bad value for {name}: {value!r}") from None
+    return model, query, k, resolved
+
+
+def format_result(path, score):
+    if isinstance(score, np.generic):
+        score = score.item()
+    return {"path": path, "title": os.path.basename(path), "category": category_of(path), "score": score}
+
+
+# Every retrieval model over the shared read-only indexes, with no UI; the search server and the apps use it
+class SearchEngine:
+    def __init__(self, base_path=BASE_PATH, shards=0, replicas=REPLICAS):
+        """
+        Collections are opened on first use. Any number of threads may search at once: an index
+        handle never changes, and a new generation is swapped in as a new handle.
+
+        shards > 0 partitions the content index of the Boolean, TF-IDF and BM25 models by
+        document across that many worker processes, in `replicas` sets so that many sharded
+        queries run at once (see sharded_index.py).
+        """
+        self.base_path = base_path
+        self.shards = shards
+        self.replicas = replicas
+        self._services = {}  # collection -> IndexService
+        self._derived = OrderedDict()  # (name, generation) -> model, least recently used first
+        self._sharded = {}  # generation -> ShardedIndex; kept out of the LRU, retired by newer generations
+        self._lock = threading.Lock()
+        self._build_lock = threading.RLock()  # One build at a time, so concurrent misses build once; builds may nest
+
+    def service(self, collection):
+        with self._lock:
+            service = self._services.get(collection)
+            if service is None:
+                index_path, analyzer, rebuild = COLLECTIONS[collection]
+                service = self._services[collection] = open_service(self.base_path, index_path, analyzer,
+                                                                    rebuild=rebuild)
+            return service
+
+    def derived(self, handle, name, build):
+        """
+        Return build(handle), built once per index generation and shared by every request.
+        """
+        key = (name, handle.generation)
+        with self._lock:
+            if key in self._derived:
+                self._derived.move_to_end(key)
+                return self._derived[key]
+        with self._build_lock:
+            with self._lock:
+                if key in self._derived:
+                    return self._derived[key]
+            value = build(handle)
+            with self._lock:
+                self._derived[key] = value
+                while len(self._derived) > MAX_DERIVED:
+                    self._derived.popitem(last=False)
+            return value
+
+    @contextmanager
+    def sharded(self, handle):
+        """
+        Use the ShardedIndex over the handle's content index, started once per generation:
+        with engine.sharded(handle) as shards: ... Once a newer generation's is started, an older
+        one is stopped when its last user is done.
+        """
+        generation = handle.generation
+        with self._lock:
+            shards = self._sharded.get(generation)
+            if shards is not None:
+                shards.acquire()
+        if shards is None:
+            with self._build_lock:
+                with self._lock:
+                    shards = self._sharded.get(generation)
+                if shards is None:
+                    shards = open_shards(handle.content_index, self.shards, self.replicas)
+                with self._lock:
+                    self._sharded[generation] = shards
+                    shards.acquire()
+                    newest = max(self._sharded)
+                    retired = [self._sharded.pop(old) for old in list(self._sharded) if old < newest]
+                for old in retired:
+                    old.retire()
+        try:
+            yield shards
+        finally:
+            shards.release()
+
+    def search(self, model, query, k=None, snippets=False, **options):
+        """
+        Run one query. Returns {"model", "query", "generation", "results"}, each result a
+        {"path", "title", "category", "score"} dict, best first, plus a "snippet" of the document
+        around the query terms with snippets=True. k=None returns every result.
+        Raises ValueError for an unknown model, a bad option or a malformed query.
+        """
+        return self._search(*resolve_request(model, query, k, options), handles={}, snippets=snippets)
+
+    def search_batch(self, requests):
+        """
+        Run a list of {"model", "query", "k", "options", "snippets"} requests against one index
+        handle per collection; identical requests are evaluated once. Returns the responses in order; a
+        request that fails gets {"error": message} instead, with "server_error": True when the request
+        was valid but the search itself failed. One failing request never fails the others.
+        """
+        handles = {}
+        responses = {}
+        results = []
+        for request in requests:
+            try:
+                if not isinstance(request, dict):
+                    raise ValueError("Each request must be a JSON object")
+                model, query, k, options = resolve_request(request.get("model"), request.get("query"),
+                                                           request.get("k"), request.get("options"))
+                snippets = request.get("snippets", False)
+                if not isinstance(snippets, bool):
+                    raise ValueError("snippets must be true or false")
+                key = (query, model, k, tuple(sorted(options.items())), snippets)  # Responses echo the query as sent
+                if key not in responses:
+                    responses[key] = self._search(model, query, k, options, handles, snippets)
+                results.append(responses[key])
+            except ValueError as e:
+                results.append({"error": str(e)})
+            except Exception as e:
+                results.append({"error": f"Search failed: {e}", "server_error": True})
+        return results
+
+    def _handle(self, collection, handles):
+        handle = handles.get(collection)
+        if handle is None:
+            handle = handles[collection] = self.service(collection).handle()  # Taken once, so a batch never mixes generations
+        return handle
+
+    def _search(self, model, query, k, options, handles, snippets=False):
+        collection, rank, _ = MODELS[model]
+        handle = self._handle(collection, handles)
+        key = cache_key(query.lower(), model, k=k, **options)  # Every model lowercases the query
+        results = self.service(collection).cache.get_or_compute(key, handle.generation,
+                                                                lambda: rank(self, handle, query, k, **options)[:k])
+        response = {"model": model, "query": query, "generation": handle.generation,
+                    "results": [format_result(path, score) for path, score in results]}
+        if snippets:
+            found = self.snippets(query, [path for path, _ in results], self._handle(SNIPPET_COLLECTION, handles))
+            for result in response["results"]:
+                result["snippet"] = found.get(result["path"], "")
+        return response
+
+    def snippets(self, query, paths, handle=None):
+        """
+        Return {path: Markdown snippet} around the query terms for documents of the collection.
+        Term positions come from the positional index and the text from the compressed document
+        store, so only one store block is decompressed per document and no file is re-read.
+        """
+        handle = handle or self.service(SNIPPET_COLLECTION).handle()
+        positional_index, _ = proximity_indexes(self, handle)
+        store = document_store(self, handle)
+        terms = [term for term in dict.fromkeys(tokenize(query)) if term not in OPERATORS and term in positional_index.index]
+        snippets = {}
+        for path in paths:
+            doc_id, store_id = positional_index.docs.ids.get(path), store.doc_id(path)
+            if doc_id is None or store_id is None:
+                continue  # Not in this generation
+            positions = [position for term in terms for position in positional_index.positions(term, doc_id)]
+            snippets[path] = store.snippet(store_id, positions)
+        return snippets
+
+    def close(self):
+        """
+        Stop the shard worker processes (once the queries using them are done).
+        """
+        with self._lock:
+            sharded = list(self._sharded.values())
+            self._sharded.clear()
+        for shards in sharded:
+            shards.retire()
+
+    def models(self):
+        return {name: {"collection": collection, "options": dict(defaults)}
+                for name, (collection, _, defaults) in MODELS.items()}
+
+    def stats(self):
+        """
+        Query cache statistics per opened collection.
+        """
+        with self._lock:
+            services = dict(self._services)
+        return {collection: service.cache.stats() for collection, service in services.items()}
+
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def open_engine(base_path=BASE_PATH):
+    """
+    Return the process-wide SearchEngine for base_path, creating it on first use.
+    """
+    with _engines_lock:
+        engine = _engines.get(base_path)
+        if engine is None:
+            engine = _engines[base_path] = SearchEngine(base_path)
+        return engine
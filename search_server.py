@@ -0,0 +1,221 @@
+import argparse
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from http import HTTPStatus
+from urllib.parse import parse_qsl, urlsplit
+
+from search_engine import BASE_PATH, SearchEngine
+from sharded_index import REPLICAS
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Requests arriving within BATCH_WINDOW seconds of the first are run together, up to MAX_BATCH at a time
+BATCH_WINDOW = 0.002
+MAX_BATCH = 64
+
+# Largest request body accepted, in bytes
+MAX_BODY = 1 << 20
+
+
+# Collects search requests from every connection and runs them in batches on worker threads
+class Batcher:
+    def __init__(self, engine, executor, window=BATCH_WINDOW, max_batch=MAX_BATCH):
+        self.engine = engine
+        self.executor = executor
+        self.window = window
+        self.max_batch = max_batch
+        self.queue = asyncio.Queue()
+
+    async def submit(self, requests):
+        """
+        Queue requests and wait for their responses (in order).
+        """
+        loop = asyncio.get_running_loop()
+        futures = [loop.create_future() for _ in requests]
+        for request, future in zip(requests, futures):
+            self.queue.put_nowait((request, future))
+        return await asyncio.gather(*futures)
+
+    async def run(self):
+        """
+        Drain the queue forever. A batch is handed to the executor without waiting for it, so
+        batches run concurrently as readers of the same immutable index handles.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_batch:
+                if not self.queue.empty():
+                    batch.append(self.queue.get_nowait())
+                    continue
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            done = loop.run_in_executor(self.executor, self.engine.search_batch, [request for request, _ in batch])
+            done.add_done_callback(partial(self._deliver, batch))
+
+    def _deliver(self, batch, done):
+        for i, (_, future) in enumerate(batch):
+            if future.done():
+                continue  # The client went away
+            if done.exception() is not None:
+                future.set_exception(done.exception())
+            else:
+                future.set_result(done.result()[i])
+
+
+def http_response(status, payload, keep_alive=True):
+    body = json.dumps(payload).encode("utf-8")
+    head = (f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode("latin-1") + body
+
+
+# JSON HTTP API over a SearchEngine:
+#   POST /search  {"model", "query", "k", "options", "snippets"} -> response, or {"requests": [...]} -> {"responses": [...]}
+#   GET  /search?model=bm25&q=binary+tree&k=10&snippets=1 (other parameters are options)
+#   GET  /models, GET /stats, GET /health
+class SearchServer:
+    def __init__(self, engine, workers=None, window=BATCH_WINDOW, max_batch=MAX_BATCH):
+        self.engine = engine
+        self.executor = ThreadPoolExecutor(workers)
+        self.window = window
+        self.max_batch = max_batch
+        self.batcher = None
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT, ready=None):
+        """
+        Serve until cancelled. ready(sockets) is called once the server is listening.
+        """
+        self.batcher = Batcher(self.engine, self.executor, self.window, self.max_batch)
+        batch_task = asyncio.create_task(self.batcher.run())
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        try:
+            if ready is not None:
+                ready(server.sockets)
+            async with server:
+                await server.serve_forever()
+        finally:
+            batch_task.cancel()
+            self.executor.shutdown(wait=False)
+
+    async def handle_connection(self, reader, writer):
+        """
+        Minimal HTTP/1.1: one request at a time per connection, kept alive unless the client says close.
+        """
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                    headers = {}
+                    while True:
+                        line = await reader.readline()
+                        if line in (b"\r\n", b"\n", b""):
+                            break
+                        name, _, value = line.decode("latin-1").partition(":")
+                        headers[name.strip().lower()] = value.strip()
+                    length = int(headers.get("content-length", 0))
+                except ValueError:
+                    writer.write(http_response(HTTPStatus.BAD_REQUEST, {"error": "Malformed request"}, False))
+                    break
+                if length > MAX_BODY:
+                    writer.write(http_response(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": "Request too large"}, False))
+                    break
+                body = await reader.readexactly(length) if length > 0 else b""
+
+                status, payload = await self.route(method, target, body)
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                writer.write(http_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def route(self, method, target, body):
+        url = urlsplit(target)
+        if url.path == "/search":
+            if method == "POST":
+                try:
+                    request = json.loads(body)
+                except ValueError:
+                    return HTTPStatus.BAD_REQUEST, {"error": "Body is not valid JSON"}
+            elif method == "GET":
+                options = dict(parse_qsl(url.query))
+                request = {"model": options.pop("model", None), "query": options.pop("q", ""),
+                           "snippets": options.pop("snippets", "").lower() in ("1", "true", "yes"), "options": options}
+                if "k" in options:
+                    try:
+                        request["k"] = int(options.pop("k"))
+                    except ValueError:
+                        return HTTPStatus.BAD_REQUEST, {"error": "k must be a positive integer"}
+            else:
+                return HTTPStatus.METHOD_NOT_ALLOWED, {"error": "Use GET or POST"}
+            return await self.search(request)
+        if method != "GET":
+            return HTTPStatus.METHOD_NOT_ALLOWED, {"error": "Use GET"}
+        if url.path == "/models":
+            return HTTPStatus.OK, self.engine.models()
+        if url.path == "/stats":
+            return HTTPStatus.OK, self.engine.stats()
+        if url.path == "/health":
+            return HTTPStatus.OK, {"status": "ok"}
+        return HTTPStatus.NOT_FOUND, {"error": f"No such endpoint: {url.path}"}
+
+    async def search(self, request):
+        try:
+            if isinstance(request, dict) and "requests" in request:
+                if not isinstance(request["requests"], list):
+                    return HTTPStatus.BAD_REQUEST, {"error": "requests must be a list"}
+                return HTTPStatus.OK, {"responses": await self.batcher.submit(request["requests"])}
+            (response,) = await self.batcher.submit([request])
+        except Exception as e:
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": f"Search failed: {e}"}
+        if "error" in response:
+            status = HTTPStatus.INTERNAL_SERVER_ERROR if response.get("server_error") else HTTPStatus.BAD_REQUEST
+            return status, response
+        return HTTPStatus.OK, response
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="JSON HTTP search server over the document indexes.")
+    parser.add_argument("--base-path", default=BASE_PATH, help="documents folder")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=None, help="search threads (default: the executor's)")
+    parser.add_argument("--batch-window", type=float, default=BATCH_WINDOW, help="seconds to gather a batch")
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH)
+    parser.add_argument("--shards", type=int, default=0,
+                        help="worker processes the ranked content index is partitioned across (default: none)")
+    parser.add_argument("--replicas", type=int, default=REPLICAS,
+                        help="sets of shard workers, i.e. sharded queries run at once")
+    args = parser.parse_args(argv)
+
+    engine = SearchEngine(args.base_path, args.shards, args.replicas)
+    server = SearchServer(engine, args.workers, args.batch_window, args.max_batch)
+    ready = lambda sockets: print(f"Serving search on http://{args.host}:{sockets[0].getsockname()[1]}")
+    try:
+        asyncio.run(server.serve(args.host, args.port, ready))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        engine.close()
+
+
+if __name__ == "__main__":
+    main()
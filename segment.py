@@ -0,0 +1,260 @@
+import os
+import mmap
+import struct
+import sys
+from array import array
+
+from postings_codec import CODEC_IDS, CODEC_NAMES, CODECS, DEFAULT_CODEC, BlockPostings, encode_postings
+
+# On-disk segment layout (all integers little-endian):
+#   terms.bin    - magic, term count, postings codec ID, fixed-width entry table sorted by term
+#                  (with max freq / doc length), UTF-8 term blob
+#   postings.bin - per term: skip table and blocks of delta-encoded doc-ID gaps and term frequencies,
+#                  compressed with the segment's codec (see postings_codec.py)
+#   docs.bin     - magic, doc count, deleted count, uint32 offset table, uint32 doc lengths,
+#                  uint32 deleted (tombstoned) doc IDs, UTF-8 path blob
+#   surface/     - optional nested segment of surface-form counts, only for postings whose count
+#                  differs from the term frequency (see InvertedIndexer.surface_postings)
+TERMS_FILE = "terms.bin"
+POSTINGS_FILE = "postings.bin"
+DOCS_FILE = "docs.bin"
+SURFACE_SEGMENT = "surface"
+
+TERMS_MAGIC = b"IRT5"
+DOCS_MAGIC = b"IRD3"
+HEADER = struct.Struct("<4sI")  # magic, count
+TERM_ENTRY = struct.Struct("<IIQId")  # term blob offset, term length, postings byte offset, doc freq, max tf
+OFFSET = struct.Struct("<I")
+
+
+def _little_endian(values):
+    values = array("I", values)
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values
+
+
+def _open_mmap(path):
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _has_magic(path, magic):
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(magic)) == magic
+    except OSError:
+        return False
+
+
+def segment_exists(path):
+    """
+    Return True if path holds a complete segment in the current format.
+    """
+    return (_has_magic(os.path.join(path, TERMS_FILE), TERMS_MAGIC)
+            and _has_magic(os.path.join(path, DOCS_FILE), DOCS_MAGIC)
+            and os.path.exists(os.path.join(path, POSTINGS_FILE)))
+
+
+def write_segment(path, index, docs, doc_lengths=(), codec=DEFAULT_CODEC):
+    """
+    Write a term -> postings mapping, its doc table and doc lengths to a segment directory,
+    compressing the postings with the named codec. Postings read from a segment in the same codec
+    are copied through as encoded (their documents' lengths must not have changed).
+    """
+    os.makedirs(path, exist_ok=True)
+    terms = sorted(index)
+
+    # Postings and term dictionary
+    entries = []
+    blob = bytearray()
+    offset = 0
+    with open(os.path.join(path, POSTINGS_FILE), "wb") as f:
+        for term in terms:
+            postings = index[term]
+            if isinstance(postings, BlockPostings) and postings.end is not None and postings.codec is CODECS[codec]:
+                data = postings.data[postings.start:postings.end]
+                max_tf = postings.max_tf
+            else:
+                data = bytearray()
+                max_tf = encode_postings(postings.gaps, postings.freqs, doc_lengths, CODECS[codec], data)
+            encoded = term.encode("utf-8")
+            entries.append(TERM_ENTRY.pack(len(blob), len(encoded), offset, len(postings), max_tf))
+            blob += encoded
+            f.write(data)
+            offset += len(data)
+
+    with open(os.path.join(path, TERMS_FILE), "wb") as f:
+        f.write(HEADER.pack(TERMS_MAGIC, len(terms)))
+        f.write(OFFSET.pack(CODEC_IDS[codec]))
+        f.writelines(entries)
+        f.write(blob)
+
+    # Doc table
+    blob = bytearray()
+    offsets = [0]
+    for doc_id in range(len(docs)):
+        blob += docs.path(doc_id).encode("utf-8")
+        offsets.append(len(blob))
+    deleted = sorted(getattr(docs, "deleted", ()))
+    with open(os.path.join(path, DOCS_FILE), "wb") as f:
+        f.write(HEADER.pack(DOCS_MAGIC, len(docs)))
+        f.write(OFFSET.pack(len(deleted)))
+        f.write(_little_endian(offsets).tobytes())
+        lengths = list(doc_lengths)[:len(docs)]
+        f.write(_little_endian(lengths + [0] * (len(docs) - len(lengths))).tobytes())
+        f.write(_little_endian(deleted).tobytes())
+        f.write(blob)
+
+
+# Read-only term dictionary backed by terms.bin; binary search over the sorted entry table
+class SegmentTerms:
+    def __init__(self, data, postings):
+        self.data = data
+        self.postings = postings
+        magic, self.count = HEADER.unpack_from(data, 0)
+        if magic != TERMS_MAGIC:
+            raise ValueError("not a term dictionary file")
+        self.codec = CODECS[CODEC_NAMES[OFFSET.unpack_from(data, HEADER.size)[0]]]
+        self.entries_start = HEADER.size + OFFSET.size
+        self.blob_start = self.entries_start + self.count * TERM_ENTRY.size
+
+    def _entry(self, i):
+        return TERM_ENTRY.unpack_from(self.data, self.entries_start + i * TERM_ENTRY.size)
+
+    def term(self, i):
+        term_offset, term_len, _, _, _ = self._entry(i)
+        start = self.blob_start + term_offset
+        return bytes(self.data[start:start + term_len]).decode("utf-8")
+
+    def find(self, term):
+        """
+        Return the entry number of a term, or -1 if it is not in the dictionary.
+        """
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.term(mid) < term:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo if lo < self.count and self.term(lo) == term else -1
+
+    def _postings(self, i):
+        _, _, start, doc_freq, max_tf = self._entry(i)
+        end = self._entry(i + 1)[2] if i + 1 < self.count else len(self.postings)  # Terms' postings are stored in term order
+        return BlockPostings(self.postings, start, doc_freq, self.codec, max_tf, end)
+
+    def get(self, term, default=None):
+        i = self.find(term)
+        return self._postings(i) if i >= 0 else default
+
+    def __getitem__(self, term):
+        postings = self.get(term)
+        if postings is None:
+            raise KeyError(term)
+        return postings
+
+    def __contains__(self, term):
+        return self.find(term) >= 0
+
+    def __iter__(self):
+        return (self.term(i) for i in range(self.count))
+
+    def items(self):
+        for i in range(self.count):
+            yield self.term(i), self._postings(i)
+
+    def __len__(self):
+        return self.count
+
+
+# Read-only doc table backed by docs.bin
+class SegmentDocs:
+    def __init__(self, data):
+        self.data = data
+        magic, self.count = HEADER.unpack_from(data, 0)
+        if magic != DOCS_MAGIC:
+            raise ValueError("not a doc table file")
+        deleted_count = OFFSET.unpack_from(data, HEADER.size)[0]
+        self.offsets_start = HEADER.size + OFFSET.size
+        self.lengths_start = self.offsets_start + (self.count + 1) * OFFSET.size
+        deleted_start = self.lengths_start + self.count * OFFSET.size
+        self.deleted = frozenset(struct.unpack_from(f"<{deleted_count}I", data, deleted_start))
+        self.blob_start = deleted_start + deleted_count * OFFSET.size
+
+    def path(self, doc_id):
+        if not 0 <= doc_id < self.count:
+            raise IndexError(doc_id)
+        start, end = struct.unpack_from("<II", self.data, self.offsets_start + doc_id * OFFSET.size)
+        return bytes(self.data[self.blob_start + start:self.blob_start + end]).decode("utf-8")
+
+    def length(self, doc_id):
+        return OFFSET.unpack_from(self.data, self.lengths_start + doc_id * OFFSET.size)[0]
+
+    @property
+    def paths(self):
+        return [self.path(doc_id) for doc_id in range(self.count)]
+
+    def live_count(self):
+        return self.count - len(self.deleted)
+
+    def live_paths(self):
+        return [self.path(doc_id) for doc_id in range(self.count) if doc_id not in self.deleted]
+
+    def __len__(self):
+        return self.count
+
+
+# Read-only doc-length sequence over the lengths table in docs.bin
+class SegmentDocLengths:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def __getitem__(self, doc_id):
+        if not 0 <= doc_id < len(self.docs):
+            raise IndexError(doc_id)
+        return self.docs.length(doc_id)
+
+    def __iter__(self):
+        return (self.docs.length(doc_id) for doc_id in range(len(self.docs)))
+
+    def toarray(self):
+        start = self.docs.lengths_start
+        lengths = array("I")
+        lengths.frombytes(self.docs.data[start:start + len(self.docs) * OFFSET.size])
+        if sys.byteorder != "little":
+            lengths.byteswap()
+        return lengths
+
+    def __len__(self):
+        return len(self.docs)
+
+
+# Memory-mapped segment; nothing is decoded until a term is looked up
+class Segment:
+    def __init__(self, path):
+        self.path = path
+        self._maps = [_open_mmap(os.path.join(path, name)) for name in (TERMS_FILE, POSTINGS_FILE, DOCS_FILE)]
+        terms_data, postings_data, docs_data = self._maps
+        self.terms = SegmentTerms(terms_data, postings_data)
+        self.docs = SegmentDocs(docs_data)
+        self.doc_lengths = SegmentDocLengths(self.docs)
+        surface_path = os.path.join(path, SURFACE_SEGMENT)
+        self.surface = Segment(surface_path) if segment_exists(surface_path) else None
+
+    def close(self):
+        for data in self._maps:
+            if isinstance(data, mmap.mmap):
+                data.close()
+        if self.surface is not None:
+            self.surface.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
@@ -0,0 +1,291 @@
+import os
+import queue
+import heapq
+import shutil
+import threading
+import multiprocessing
+from bisect import bisect_right
+from itertools import islice
+
+from bm25 import BM25Index
+from boolean_query import QueryPlanner
+from indexer import DocTable, InvertedIndexer, PostingsBuilder
+from ranking import inverse_document_frequencies, tf_idf_scores
+from segment import segment_exists
+
+# Worker processes are spawned rather than forked: the search server forks from a threaded process
+START_METHOD = "spawn"
+
+# Worker sets per sharded index: each serves one query at a time, so this many queries run at once
+REPLICAS = 2
+
+
+def shard_offsets(num_docs, num_shards):
+    """
+    First doc ID of each shard: contiguous doc-ID ranges of (nearly) equal size, so every shard's
+    results are already in global doc-ID order and concatenate without a merge.
+    """
+    return [num_docs * i // num_shards for i in range(num_shards)]
+
+
+def partition(index, offsets):
+    """
+    Split an index by document into in-memory shards with local doc IDs (global ID - offset).
+    """
+    bounds = offsets[1:] + [len(index.docs)]
+    doc_lengths = index.doc_length_array()
+    shards = []
+    for start, end in zip(offsets, bounds):
+        docs = DocTable([index.docs.path(doc_id) for doc_id in range(start, end)],
+                        [doc_id - start for doc_id in index.docs.deleted if start <= doc_id < end])
+        shard = InvertedIndexer(docs)
+        shard.doc_lengths = doc_lengths[start:end]
+        shards.append(shard)
+    for term, postings in index.index.items():
+        for doc_id, freq in postings.items():
+            i = bisect_right(offsets, doc_id) - 1
+            shard = shards[i]
+            builder = shard.index.get(term)
+            if builder is None:
+                builder = shard.index[term] = PostingsBuilder()
+            builder.append(doc_id - offsets[i], freq)
+    for term, postings in index.surface.items():
+        for doc_id, freq in postings.items():
+            i = bisect_right(offsets, doc_id) - 1
+            shard = shards[i]
+            builder = shard.surface.get(term)
+            if builder is None:
+                builder = shard.surface[term] = PostingsBuilder()
+            builder.append(doc_id - offsets[i], freq)
+    return shards
+
+
+def write_shards(index, path, num_shards):
+    """
+    Save the shards of a saved index under path (shard i in path/i) unless they already exist,
+    and return the shard paths.
+    """
+    paths = [os.path.join(path, str(i)) for i in range(num_shards)]
+    if all(segment_exists(shard_path) for shard_path in paths):
+        return paths
+    # Written aside and renamed into place, so a concurrent writer or reader never sees half a shard set
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    shutil.rmtree(temp_path, ignore_errors=True)
+    for i, shard in enumerate(partition(index, shard_offsets(len(index.docs), num_shards))):
+        shard.save(os.path.join(temp_path, str(i)))
+    try:
+        os.rename(temp_path, path)
+    except OSError:
+        shutil.rmtree(temp_path, ignore_errors=True)  # Another process published the same shards first
+    return paths
+
+
+# Worker process serving one shard. Requests arrive as (method, args) on the pipe; replies are
+# (True, result) or (False, exception). Doc IDs in replies are global.
+def serve_shard(conn, path, offset):
+    index = InvertedIndexer.load(path)
+    planner = QueryPlanner(index)
+    bm25 = {}  # (delta, collection statistics) -> BM25Index
+
+    def bm25_index(delta, num_live_docs, avg_doc_length):
+        key = (delta, num_live_docs, avg_doc_length)
+        if key not in bm25:
+            bm25[key] = BM25Index(index, delta=delta, num_live_docs=num_live_docs, avg_doc_length=avg_doc_length)
+        return bm25[key]
+
+    def with_paths(results):
+        return [(doc_id + offset, index.docs.path(doc_id), score) for doc_id, score in results]
+
+    def collection():
+        lengths = index.doc_length_array()
+        live = [doc_id for doc_id in range(len(index.docs)) if doc_id not in index.docs.deleted]
+        return len(live), sum(lengths[doc_id] for doc_id in live)
+
+    def doc_freqs(terms):
+        counter = bm25_index(0.0, None, None)
+        return {term: (index.doc_freq(term), counter.doc_freq(term)) for term in terms}
+
+    def tf_idf(terms, idf, k):
+        return with_paths(tf_idf_scores(terms, index, idf, k))
+
+    def bm25_top_k(terms, doc_freqs, k, delta, num_live_docs, avg_doc_length):
+        k = k if k is not None else len(index.docs)
+        return with_paths(bm25_index(delta, num_live_docs, avg_doc_length).top_k(terms, k, doc_freqs))
+
+    def boolean(query_tree):
+        return with_paths((doc_id, None) for doc_id in planner.evaluate(query_tree))
+
+    methods = {"collection": collection, "doc_freqs": doc_freqs, "tf_idf": tf_idf, "bm25": bm25_top_k,
+               "boolean": boolean}
+    try:
+        while True:
+            try:
+                request = conn.recv()
+            except EOFError:
+                break
+            if request is None:
+                break
+            method, args = request
+            try:
+                reply = (True, methods[method](*args))
+            except Exception as e:
+                reply = (False, e)
+            try:
+                conn.send(reply)
+            except OSError:
+                break  # The coordinator dropped this worker set
+    finally:
+        index.segment.close()
+        conn.close()
+
+
+# One worker process per shard, with the coordinator's end of each pipe
+class ShardWorkers:
+    def __init__(self, paths, offsets):
+        context = multiprocessing.get_context(START_METHOD)
+        self.connections = []
+        self.processes = []
+        for path, offset in zip(paths, offsets):
+            parent, child = context.Pipe()
+            process = context.Process(target=serve_shard, args=(child, path, offset), daemon=True)
+            process.start()
+            child.close()
+            self.connections.append(parent)
+            self.processes.append(process)
+
+    def stop(self):
+        for conn in self.connections:
+            try:
+                conn.send(None)
+            except OSError:
+                pass
+            conn.close()
+        for process in self.processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+
+
+# Coordinator for an index partitioned by document across worker processes. Every query is
+# scattered to all shards and the per-shard top k are merged; scores use the whole collection's
+# document counts and frequencies, so they equal the unsharded index's. Up to `replicas` queries
+# are in flight at once, each on its own set of workers.
+class ShardedIndex:
+    def __init__(self, paths, offsets, replicas=REPLICAS):
+        self.paths = paths
+        self.offsets = offsets
+        self.replicas = replicas
+        self._idle = queue.Queue()  # ShardWorkers not serving a query
+        for _ in range(replicas):
+            self._idle.put(ShardWorkers(paths, offsets))
+        self._lock = threading.Lock()
+        self._users = 0
+        self._retired = False
+        self._closed = False
+        self._doc_freqs = {}  # term -> (doc freq, BM25 doc freq) over all shards
+        self.num_live_docs, total_length = (sum(values) for values in zip(*self.scatter("collection")))
+        self.avg_doc_length = total_length / self.num_live_docs if self.num_live_docs else 0.0
+
+    def scatter(self, method, *args):
+        """
+        Run method(*args) on every shard in parallel; returns the results in shard order.
+        Raises the first shard's exception if any shard fails.
+        """
+        if self._closed:
+            raise OSError("sharded index is closed")
+        workers = self._idle.get()
+        try:
+            for conn in workers.connections:
+                conn.send((method, args))
+            replies = [conn.recv() for conn in workers.connections]
+        except BaseException:
+            # Replies left unread in the pipes would be taken for the next query's: replace the set
+            workers.stop()
+            workers = ShardWorkers(self.paths, self.offsets)
+            raise
+        finally:
+            self._idle.put(workers)
+        for ok, result in replies:
+            if not ok:
+                raise result
+        return [result for _, result in replies]
+
+    def doc_freqs(self, terms):
+        """
+        {term: (live documents with the term, of those with a positive frequency)} over all shards.
+        """
+        missing = [term for term in dict.fromkeys(terms) if term not in self._doc_freqs]
+        if missing:
+            totals = {term: (0, 0) for term in missing}
+            for results in self.scatter("doc_freqs", missing):
+                for term, (doc_freq, bm25_freq) in results.items():
+                    total = totals[term]
+                    totals[term] = (total[0] + doc_freq, total[1] + bm25_freq)
+            self._doc_freqs.update(totals)
+        return {term: self._doc_freqs[term] for term in terms}
+
+    def merge(self, results, k):
+        """
+        Best k of the shards' (doc ID, path, score) lists, each best first; ties by doc ID.
+        """
+        merged = heapq.merge(*results, key=lambda result: (-result[2], result[0]))
+        return [(path, score) for _, path, score in islice(merged, k)]
+
+    def tf_idf(self, query_terms, k=None):
+        doc_freqs = self.doc_freqs(query_terms)
+        idf = inverse_document_frequencies(query_terms, self.num_live_docs, lambda term: doc_freqs[term][0])
+        return self.merge(self.scatter("tf_idf", query_terms, idf, k), k)
+
+    def bm25(self, query_terms, k=None, delta=0.0):
+        doc_freqs = {term: bm25_freq for term, (_, bm25_freq) in self.doc_freqs(query_terms).items()}
+        return self.merge(self.scatter("bm25", query_terms, doc_freqs, k, delta, self.num_live_docs,
+                                       self.avg_doc_length), k)
+
+    def boolean(self, query_tree):
+        """
+        Paths of the documents matching a query tree, in doc-ID order.
+        """
+        return [path for results in self.scatter("boolean", query_tree) for _, path, _ in results]
+
+    def acquire(self):
+        with self._lock:
+            if self._closed:
+                raise OSError("sharded index is closed")
+            self._users += 1
+            return self
+
+    def release(self):
+        with self._lock:
+            self._users -= 1
+            close = self._retired and not self._users
+        if close:
+            self.close()
+
+    def retire(self):
+        """
+        Close once every acquire() has been released (now, if none is outstanding).
+        """
+        with self._lock:
+            self._retired = True
+            close = not self._users
+        if close:
+            self.close()
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        for _ in range(self.replicas):
+            self._idle.get().stop()  # Waits for a query still running on the set
+
+
+def open_shards(index, num_shards, replicas=REPLICAS):
+    """
+    Return a ShardedIndex over a saved (segment-backed) index, split into num_shards shards served
+    by `replicas` sets of worker processes. The shards are saved next to the index's segment, so they are written once per
+    generation and removed with it.
+    """
+    path = f"{index.segment.path.rstrip(os.sep)}-shards{num_shards}"
+    paths = write_shards(index, path, num_shards)
+    return ShardedIndex(paths, shard_offsets(len(index.docs), num_shards), replicas)
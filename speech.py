@@ -0,0 +1,107 @@
+import json
+import threading
+import time
+import speech_recognition as sr
+
+
+# Recognizer backends: name -> function(recognizer, audio) -> transcript.
+# sphinx and vosk run locally (pocketsphinx / a downloaded vosk model); google needs the network.
+def recognize_sphinx(recognizer, audio):
+    return recognizer.recognize_sphinx(audio)
+
+
+def recognize_vosk(recognizer, audio):
+    result = recognizer.recognize_vosk(audio)
+    return json.loads(result).get("text", "") if result.lstrip().startswith("{") else result
+
+
+def recognize_google(recognizer, audio):
+    return recognizer.recognize_google(audio)
+
+
+BACKENDS = {"sphinx": recognize_sphinx, "vosk": recognize_vosk, "google": recognize_google}
+OFFLINE_BACKENDS = ("sphinx", "vosk")
+
+
+def register_backend(name, recognize):
+    BACKENDS[name] = recognize
+
+
+def transcribe(audio, backend="sphinx", recognizer=None):
+    """
+    Return the transcript of an AudioData clip, or None if nothing was recognized.
+    Raises sr.RequestError if the backend is unavailable.
+    """
+    recognizer = recognizer or sr.Recognizer()
+    try:
+        return BACKENDS[backend](recognizer, audio).strip() or None
+    except sr.UnknownValueError:
+        return None
+
+
+def transcribe_file(source, backend="sphinx"):
+    """
+    Transcribe a WAV/AIFF/FLAC file (path or file-like object), e.g. a recorded test query.
+    """
+    recognizer = sr.Recognizer()
+    with sr.AudioFile(source) as audio_file:
+        audio = recognizer.record(audio_file)
+    return transcribe(audio, backend, recognizer)
+
+
+# Microphone capture on a background thread, recognizing the query chunk by chunk
+class BackgroundCapture:
+    def __init__(self, backend="sphinx", chunk_seconds=2.0):
+        """
+        Speech is cut into chunks of at most chunk_seconds, each transcribed as soon as it ends;
+        the transcripts so far are the partial transcript. A chunk that ends before the limit
+        ended on a pause, which makes the transcript final.
+        """
+        self.backend = backend
+        self.chunk_seconds = chunk_seconds
+        self.recognizer = sr.Recognizer()
+        self.partials = []
+        self.final = None
+        self.error = None
+        self._lock = threading.Lock()
+        self._stop = None
+        self.started = None
+
+    def start(self, source=None):
+        source = source or sr.Microphone()
+        self.started = time.monotonic()
+        self._stop = self.recognizer.listen_in_background(source, self._on_chunk, phrase_time_limit=self.chunk_seconds)
+
+    @property
+    def running(self):
+        return self._stop is not None
+
+    @property
+    def transcript(self):
+        with self._lock:
+            return " ".join(self.partials)
+
+    def stop(self):
+        """
+        Stop listening; whatever was recognized so far becomes the final transcript.
+        """
+        if self._stop is not None:
+            stop, self._stop = self._stop, None
+            stop(wait_for_stop=False)  # May be called from the capture thread itself
+        with self._lock:
+            if self.final is None and self.partials:
+                self.final = " ".join(self.partials)
+
+    def _on_chunk(self, recognizer, audio):
+        try:
+            text = transcribe(audio, self.backend, recognizer)
+        except sr.RequestError as e:
+            self.error = f"Could not request results; {e}"
+            self.stop()
+            return
+        if text:
+            with self._lock:
+                self.partials.append(text)
+        duration = len(audio.frame_data) / (audio.sample_rate * audio.sample_width)
+        if duration < self.chunk_seconds * 0.95 and self.partials:
+            self.stop()
@@ -0,0 +1,73 @@
+from array import array
+from bisect import bisect_left
+
+BOUNDARY = "$"  # Marks the start and end of a term so prefix/suffix grams are distinct
+
+
+def kgrams(text, k):
+    return {text[i:i + k] for i in range(len(text) - k + 1)}
+
+
+# Sorted term array with a k-gram index for prefix, suffix and substring lookups
+class TermDictionary:
+    def __init__(self, terms, k=3):
+        self.k = k
+        self.terms = sorted(terms)
+        self.grams = {}  # k-gram -> ascending term numbers (array of uint32)
+
+        for term_id, term in enumerate(self.terms):
+            for gram in kgrams(f"{BOUNDARY}{term}{BOUNDARY}", k):
+                ids = self.grams.get(gram)
+                if ids is None:
+                    ids = self.grams[gram] = array("I")
+                ids.append(term_id)
+
+    def __len__(self):
+        return len(self.terms)
+
+    def prefix(self, prefix):
+        """
+        Return the terms starting with prefix, using binary search over the sorted terms.
+        """
+        start = bisect_left(self.terms, prefix)
+        results = []
+        for term in self.terms[start:]:
+            if not term.startswith(prefix):
+                break
+            results.append(term)
+        return results
+
+    def suffix(self, suffix):
+        return [term for term in self._candidates(f"{suffix}{BOUNDARY}") if term.endswith(suffix)]
+
+    def substring(self, query):
+        """
+        Return every term containing query, the same set as scanning with `query in term`.
+        """
+        if not query:
+            return list(self.terms)
+        return [term for term in self._candidates(query) if query in term]
+
+    def _candidates(self, pattern):
+        # Patterns shorter than k cannot be split into grams; union the grams that contain them
+        if len(pattern) < self.k:
+            term_ids = set()
+            for gram, ids in self.grams.items():
+                if pattern in gram:
+                    term_ids.update(ids)
+            return [self.terms[term_id] for term_id in sorted(term_ids)]
+
+        # Intersect the gram lists, smallest first; the caller filters false positives
+        lists = []
+        for gram in kgrams(pattern, self.k):
+            ids = self.grams.get(gram)
+            if ids is None:
+                return []
+            lists.append(ids)
+        lists.sort(key=len)
+        term_ids = set(lists[0])
+        for ids in lists[1:]:
+            term_ids.intersection_update(ids)
+            if not term_ids:
+                return []
+        return [self.terms[term_id] for term_id in sorted(term_ids)]
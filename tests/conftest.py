@@ -0,0 +1,52 @@
+import os
+import sys
+import random
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from indexer import DocTable, InvertedIndexer  # noqa: E402
+
+
+# A random collection: {path: {term: freq}}, with a few large documents and Zipf-like term frequencies
+def random_collection(num_docs, vocabulary, seed):
+    rng = random.Random(seed)
+    terms = [f"w{''.join(rng.choice('abcdefghij') for _ in range(4))}{i}" for i in range(vocabulary)]
+    weights = [1 / (rank + 1) for rank in range(vocabulary)]
+    collection = {}
+    for doc_id in range(num_docs):
+        counts = {}
+        for term in rng.choices(terms, weights, k=rng.choice((3, 10, 40, 200))):
+            counts[term] = counts.get(term, 0) + 1
+        collection[f"docs/{doc_id:05d}.txt"] = counts
+    return collection
+
+
+def build_index(collection, deleted=()):
+    docs = DocTable()
+    index = InvertedIndexer(docs)
+    for path, counts in collection.items():
+        index.set_doc_length(path, sum(counts.values()))
+        for term, freq in counts.items():
+            index.add(term, path, freq)
+    for path in deleted:
+        docs.delete(path)
+    return index
+
+
+@pytest.fixture
+def collection():
+    return random_collection(700, 300, seed=7)
+
+
+@pytest.fixture
+def saved_index(collection, tmp_path):
+    """
+    The collection's index saved as a segment (so postings span several blocks) and reopened.
+    """
+    path = str(tmp_path / "content")
+    build_index(collection, deleted=list(collection)[5::97]).save(path)
+    index = InvertedIndexer.load(path)
+    yield index
+    index.segment.close()
@@ -0,0 +1,72 @@
+import random
+
+import pytest
+
+from analysis import (ANALYZERS, STOP_WORDS, Analyzer, Stage, StopWords, is_noun, is_valid_word, keyword_analyzer,
+                      noun_analyzer, split_strip_analyzer, term_analyzer, word_analyzer)
+
+TEXTS = [
+    "",
+    "   \n\t ",
+    "A stack is a linear data structure. Push: adds; Pop: removes!",
+    "Stack stack, STACK (stack) stack's stacks -- ... !!!",
+    "The the THE of and a queue-based BFS, 2nd pass: x86 C++ O(n)",
+    "Ünïcödé wörds — dashes… “quotes” and naïve café",
+]
+
+
+def random_text(seed):
+    rng = random.Random(seed)
+    words = ["Stack", "stack,", "(queue)", "the", "A", "tree.", "x86", "--", "naïve", "O(n)", "Hash:", "is", "IT"]
+    return " ".join(rng.choice(words) for _ in range(rng.randint(0, 60)))
+
+
+SAMPLES = TEXTS + [random_text(seed) for seed in range(20)]
+
+
+def filtered(content, keep):
+    """
+    The per-word split/strip/lower loop the analyzers replaced, keeping the terms keep() accepts.
+    """
+    length, terms = split_strip_analyzer(content)
+    return length, {term: freq for term, freq in terms.items() if keep(term)}
+
+
+@pytest.mark.parametrize("text", SAMPLES)
+def test_analyzers_match_the_per_word_loop(text):
+    assert term_analyzer(text) == filtered(text, lambda term: True)
+    assert word_analyzer(text) == filtered(text, str.isalpha)
+    assert keyword_analyzer(text) == filtered(text, is_valid_word)
+    assert noun_analyzer(text) == filtered(text, is_noun)
+
+
+@pytest.mark.parametrize("text", SAMPLES)
+def test_query_terms_match_document_terms(text):
+    for analyzer in ANALYZERS.values():
+        terms = analyzer.terms(text)
+        assert list(dict.fromkeys(terms)) == list(analyzer(text)[1])  # Same terms, in order of first occurrence
+        assert {term: terms.count(term) for term in terms} == analyzer(text)[1]
+
+
+def test_keyword_terms_drop_stop_words_and_non_words():
+    assert keyword_analyzer.terms("The Stack, and a queue-based x86 STACK!") == ["stack", "stack"]
+    assert not STOP_WORDS & set(keyword_analyzer(" ".join(STOP_WORDS) + " stack")[1])
+
+
+def test_surface_counts_count_words_written_as_the_term():
+    text = "Stack stack, stack STACK stack"
+    length, terms = keyword_analyzer(text)
+    assert (length, terms) == (5, {"stack": 5})
+    assert keyword_analyzer.surface(text, terms) == {"stack": text.split().count("stack")} == {"stack": 2}
+    assert keyword_analyzer.surface_counts and not term_analyzer.surface_counts
+
+
+class Plural(Stage):
+    def __call__(self, tokens):
+        return [token[:-1] if token.endswith("s") else token for token in tokens]
+
+
+def test_mapping_stages_merge_frequencies():
+    analyzer = Analyzer(StopWords(), Plural())
+    assert analyzer("Stacks stack the STACKS, trees") == (5, {"stack": 3, "tree": 1})
+    assert analyzer.terms("Stacks the trees") == ["stack", "tree"]
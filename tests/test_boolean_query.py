@@ -0,0 +1,67 @@
+import random
+
+import pytest
+
+from analysis import keyword_analyzer
+from boolean_query import And, Not, Or, Term, parse_query
+from conftest import build_index, random_collection
+from ranking import apply_boolean_logic
+
+
+def random_query(rng, terms, depth=0):
+    """
+    A random query string and the function telling whether a set of terms matches it.
+    """
+    kind = rng.random() if depth < 3 else 0
+    if kind < 0.4:
+        term = rng.choice(terms)
+        return term, lambda doc_terms: term in doc_terms
+    if kind < 0.55:
+        text, match = random_query(rng, terms, depth + 1)
+        return f"not {text}", lambda doc_terms: not match(doc_terms)
+    operands = [random_query(rng, terms, depth + 1) for _ in range(rng.randint(2, 3))]
+    operator = rng.choice(("and", "or", ""))  # Juxtaposed operands are OR'ed...
+    if any(text.startswith("not ") for text, _ in operands[1:]):
+        operator = operator or "or"  # ...but "a not b" is a AND NOT b
+    text = "(" + f" {operator} ".join(text for text, _ in operands).replace("  ", " ") + ")"
+    if operator == "and":
+        return text, lambda doc_terms: all(match(doc_terms) for _, match in operands)
+    return text, lambda doc_terms: any(match(doc_terms) for _, match in operands)
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_boolean_queries_match_exhaustive_evaluation(seed):
+    collection = random_collection(300, 40, seed=seed)
+    deleted = list(collection)[::23]
+    index = build_index(collection, deleted)
+    terms = sorted(index.index)[:12] + ["missing"]
+    rng = random.Random(seed)
+    for _ in range(150):
+        query, match = random_query(rng, terms)
+        expected = [path for path, counts in collection.items() if path not in deleted and match(counts)]
+        assert apply_boolean_logic(parse_query(query), index) == expected, query
+
+
+def test_parse_query_precedence():
+    tree = parse_query("a OR b AND NOT c d")
+    assert isinstance(tree, Or)
+    first, second, third = tree.children
+    assert isinstance(first, Term) and first.term == "a"
+    assert isinstance(second, And) and isinstance(second.children[1], Not)
+    assert isinstance(third, Term) and third.term == "d"
+    assert parse_query("") is None
+
+
+@pytest.mark.parametrize("query", ["a and", "(a or b", "a )", "and a", "not", "()"])
+def test_parse_query_rejects_malformed_queries(query):
+    with pytest.raises(ValueError):
+        parse_query(query)
+
+
+def test_stop_words_are_left_out_of_queries():
+    index = build_index({"a.txt": {"stack": 2, "queue": 1}, "b.txt": {"queue": 1}, "c.txt": {"stack": 1}})
+    for query in ("stack and the", "the or stack", "stack not the", "(the) and stack", "stack and (the or a)"):
+        assert apply_boolean_logic(parse_query(query, keyword_analyzer), index) == ["a.txt", "c.txt"], query
+    for query in ("the", "not the", "(the and a)"):
+        with pytest.raises(ValueError):
+            parse_query(query, keyword_analyzer)
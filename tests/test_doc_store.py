@@ -0,0 +1,76 @@
+import re
+
+import pytest
+
+from analysis import normalize
+from doc_store import DocStore, best_window, escape_markdown, write_doc_store
+from indexer import DocTable
+from positional import PositionalIndex, token_spans, tokenize
+
+TEXTS = [
+    "A stack is a linear data structure. Push: adds; Pop: removes!",
+    "",
+    "# Heading\n\n    indented *code* and _emphasis_ -- 1. item\n- bullet [link](x) `tick` \\ back",
+    "Ünïcödé wörds — dashes… “quotes” and naïve café, stack STACK Stack.",
+    "... !!! ,,, only punctuation tokens ???",
+    "\n\t  leading and trailing whitespace\r\n  ",
+    " ".join(f"word{i}," for i in range(500)),
+]
+
+
+@pytest.fixture(params=["zlib", "lzma"])
+def store(tmp_path, request):
+    docs = DocTable([f"doc{i}.txt" for i in range(len(TEXTS) + 1)], deleted=[len(TEXTS)])
+    texts = dict(zip(docs.paths, TEXTS))
+    write_doc_store(str(tmp_path), docs, request.param, block_size=64, read=texts.__getitem__)
+    return DocStore(str(tmp_path), docs)
+
+
+def unescape_markdown(text):
+    return re.sub(r"\\(.)", r"\1", text)
+
+
+def test_documents_round_trip(store):
+    assert len(store) == len(TEXTS) + 1
+    for doc_id, text in enumerate(TEXTS):
+        assert store.doc_id(f"doc{doc_id}.txt") == doc_id
+        assert store.document(doc_id) == text
+    assert store.document(len(TEXTS)) == ""  # Deleted
+    assert store.doc_id(f"doc{len(TEXTS)}.txt") is None
+    with pytest.raises(IndexError):
+        store.document(len(TEXTS) + 1)
+
+
+def test_token_spans_align_with_tokenize():
+    for text in TEXTS:
+        spans = token_spans(text)
+        assert list(normalize(text[start:end] for start, end in spans)) == tokenize(text)
+
+
+def test_snippet_tokens_align_with_positional_index(store):
+    positional_index = PositionalIndex()
+    for doc_id, text in enumerate(TEXTS):
+        positional_index.add_document(f"doc{doc_id}.txt", tokenize(store.document(doc_id)))
+    for doc_id, text in enumerate(TEXTS):
+        tokens = tokenize(text)
+        for term in set(tokens):
+            positions = positional_index.positions(term, doc_id)
+            snippet = store.snippet(doc_id, positions, width=1)
+            bolded = re.findall(r"\*\*(.+?)\*\*(?=\.\.\.|$)", snippet)
+            assert len(bolded) == 1
+            assert list(normalize([unescape_markdown(bolded[0])])) == [term]
+
+
+def test_snippet_escapes_markdown(store):
+    snippet = store.snippet(2, [], width=100)
+    assert unescape_markdown(snippet) == " ".join(TEXTS[2].split()[1:])  # From the first token on
+    assert not re.search(r"(?<!\\)[*_#`\[\]\-]", snippet)
+    assert store.snippet(1, [0]) == ""
+    assert store.snippet(0, [99]) == escape_markdown(" ".join(TEXTS[0].split()))  # Positions past the end are ignored
+
+
+def test_snippet_window():
+    assert best_window([], 100, 30) == (0, 30)
+    assert best_window([5], 3, 30) == (0, 3)
+    assert best_window([1, 50, 52, 55, 90], 100, 10) == (48, 58)
+    assert best_window([98, 99], 100, 10) == (90, 100)
@@ -0,0 +1,161 @@
+import os
+
+import pytest
+
+from analysis import keyword_analyzer
+from corpus import build_indexes
+from indexer import InvertedIndexer
+from manifest import COMPACT_RATIO, MANIFEST_FILE, current_generation, load_manifest, update_indexes
+from postings_codec import BlockPostings
+
+TEXTS = {
+    "stacks/push.txt": "Push adds to the stack. Stack, stack!",
+    "stacks/pop.txt": "Pop removes from the stack",
+    "queues/fifo.txt": "A queue is first in first out",
+    "queues/deque.txt": "Deque: a double ended queue",
+    "trees/bst.txt": "Binary search tree nodes",
+    "trees/heap.txt": "A heap is a tree",
+    "hashing/table.txt": "Hash table buckets",
+    "hashing/probe.txt": "Linear probing in a hash table",
+}
+
+
+def write(base, name, text):
+    path = os.path.join(base, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))  # A new mtime even within the clock's resolution
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    base = str(tmp_path / "corpus")
+    for name, text in TEXTS.items():
+        write(base, name, text)
+    return base
+
+
+class Indexes:
+    """
+    update_indexes over a corpus, counting full rebuilds.
+    """
+    def __init__(self, base, index_path):
+        self.base = base
+        self.index_path = index_path
+        self.rebuilds = 0
+        self.opened = []
+
+    def rebuild(self, base):
+        self.rebuilds += 1
+        return build_indexes(base, keyword_analyzer, workers=1)
+
+    def update(self):
+        title_index, content_index = update_indexes(self.base, self.index_path, keyword_analyzer, InvertedIndexer, self.rebuild)
+        self.opened += [title_index, content_index]
+        return title_index, content_index
+
+    def close(self):
+        for index in self.opened:
+            index.segment.close()
+
+
+@pytest.fixture
+def indexes(corpus, tmp_path):
+    indexes = Indexes(corpus, str(tmp_path / "index"))
+    yield indexes
+    indexes.close()
+
+
+def live_ids(docs):
+    return {docs.path(doc_id): doc_id for doc_id in range(len(docs)) if doc_id not in docs.deleted}
+
+
+def live_postings(index, term, surface=False):
+    postings = index.surface_postings(term) if surface else index.postings(term)
+    return sorted((index.docs.path(doc_id), freq) for doc_id, freq in postings)
+
+
+def assert_same_index(index, expected):
+    assert sorted(index.docs.live_paths()) == sorted(expected.docs.live_paths())
+    assert sorted(term for term in index.index if index.doc_freq(term)) == sorted(expected.index)
+    for term in expected.index:
+        assert live_postings(index, term) == live_postings(expected, term), term
+        assert live_postings(index, term, surface=True) == live_postings(expected, term, surface=True), term
+    ids, expected_ids = live_ids(index.docs), live_ids(expected.docs)
+    for path, doc_id in expected_ids.items():
+        assert index.doc_length(ids[path]) == expected.doc_length(doc_id)
+
+
+def test_unchanged_corpus_keeps_its_generation(indexes):
+    _, content_index = indexes.update()
+    assert (content_index.generation, indexes.rebuilds) == (1, 1)
+    _, content_index = indexes.update()
+    assert (content_index.generation, indexes.rebuilds) == (1, 1)
+    assert current_generation(indexes.index_path) == 1
+
+
+def test_changes_are_patched_in_with_tombstones(indexes, corpus):
+    indexes.update()
+    write(corpus, "stacks/pop.txt", "Pop returns the top of the Stack")
+    os.remove(os.path.join(corpus, "queues/deque.txt"))
+    write(corpus, "trees/avl.txt", "AVL trees rebalance by rotation")
+
+    title_index, content_index = indexes.update()
+    assert (content_index.generation, indexes.rebuilds) == (2, 1)
+    docs = content_index.docs
+    assert len(docs.deleted) == 2  # The modified and the deleted file
+    assert live_ids(docs)[os.path.join(corpus, "stacks", "pop.txt")] > max(docs.deleted)  # Re-added under a new ID
+    assert content_index.doc_ids("deque") == []
+    assert content_index.paths("rotation") == [os.path.join(corpus, "trees", "avl.txt")]
+
+    expected_title, expected_content = build_indexes(corpus, keyword_analyzer, workers=1)
+    assert_same_index(content_index, expected_content)
+    assert_same_index(title_index, expected_title)
+    assert sorted(load_manifest(indexes.index_path)["files"]) == sorted(docs.live_paths())
+
+
+def test_patch_only_decodes_the_changed_terms(indexes, corpus, monkeypatch):
+    _, before = indexes.update()
+    decoded = []
+    decode = BlockPostings.decode
+    monkeypatch.setattr(BlockPostings, "decode", lambda postings: decoded.append(postings.start) or decode(postings))
+    write(corpus, "trees/avl.txt", "AVL tree rotation")  # Only "tree" was indexed before
+    _, after = indexes.update()
+    monkeypatch.undo()
+
+    assert decoded and set(decoded) == {before.index["tree"].start}
+    assert sorted(after.paths("tree")) == sorted(before.paths("tree") + [os.path.join(corpus, "trees", "avl.txt")])
+    for term in before.index:
+        if term != "tree":
+            old, new = before.index[term], after.index[term]
+            assert bytes(new.data[new.start:new.end]) == bytes(old.data[old.start:old.end]), term
+
+
+def test_many_tombstones_trigger_a_rebuild(indexes, corpus):
+    indexes.update()
+    changed = int(COMPACT_RATIO * len(TEXTS)) + 1
+    for name in list(TEXTS)[:changed]:
+        write(corpus, name, TEXTS[name] + " again")
+    _, content_index = indexes.update()
+    assert indexes.rebuilds == 2
+    assert not content_index.docs.deleted
+
+
+def test_touched_files_only_update_the_manifest(indexes, corpus):
+    indexes.update()
+    name = "trees/heap.txt"
+    write(corpus, name, TEXTS[name])
+    _, content_index = indexes.update()
+    assert (content_index.generation, indexes.rebuilds) == (1, 1)
+    entry = load_manifest(indexes.index_path)["files"][os.path.join(corpus, name)]
+    assert entry["mtime"] == os.stat(os.path.join(corpus, name)).st_mtime_ns
+
+
+def test_generations_are_not_reused_after_losing_the_manifest(indexes):
+    indexes.update()
+    os.remove(os.path.join(indexes.index_path, MANIFEST_FILE))
+    _, content_index = indexes.update()
+    assert content_index.generation == 2
+    assert sorted(os.listdir(indexes.index_path)) == ["2", "CURRENT", MANIFEST_FILE]
@@ -0,0 +1,88 @@
+import random
+
+import pytest
+
+from conftest import build_index
+from indexer import InvertedIndexer
+from postings_codec import BLOCK_SIZE, CODECS, BlockPostings, encode_postings
+
+MAX_UINT32 = 2 ** 32 - 1
+BOUNDARY_COUNTS = [1, 2, BLOCK_SIZE - 1, BLOCK_SIZE, BLOCK_SIZE + 1, 2 * BLOCK_SIZE, 3 * BLOCK_SIZE + 5]
+
+
+def block_values(count, seed):
+    rng = random.Random(seed)
+    return [
+        [1] * count,
+        [0] * count,
+        [MAX_UINT32] * count,
+        [rng.choice((0, 1, 2, 3, 7, 100, 5000, 1 << 20, MAX_UINT32)) for _ in range(count)],
+        [rng.getrandbits(rng.randint(1, 32)) for _ in range(count)],
+    ]
+
+
+@pytest.mark.parametrize("name", list(CODECS))
+@pytest.mark.parametrize("count", [1, 2, 59, 60, 61, 119, 120, 121, BLOCK_SIZE - 1, BLOCK_SIZE])
+def test_codec_round_trip(name, count):
+    codec = CODECS[name]
+    for values in block_values(count, seed=count):
+        out = bytearray(b"\xff\xff\xff")  # Decoding starts mid-buffer, as in a postings file
+        codec.encode(values, out)
+        out += b"\xee"
+        decoded, pos = codec.decode(bytes(out), 3, count)
+        assert decoded.tolist() == values
+        assert pos == len(out) - 1
+
+
+def random_postings(count, seed):
+    rng = random.Random(seed)
+    doc_ids = sorted(rng.sample(range(MAX_UINT32 - 1), count - 1) + [MAX_UINT32]) if count else []
+    gaps = [doc_id - previous for doc_id, previous in zip(doc_ids, [0] + doc_ids)]
+    freqs = [rng.choice((1, 1, 2, 3, 40, MAX_UINT32)) for _ in doc_ids]
+    return doc_ids, gaps, freqs
+
+
+@pytest.mark.parametrize("name", list(CODECS))
+@pytest.mark.parametrize("count", BOUNDARY_COUNTS)
+def test_block_postings_round_trip(name, count):
+    doc_ids, gaps, freqs = random_postings(count, seed=count)
+    out = bytearray(b"\x00" * 5)
+    encode_postings(gaps, freqs, (), CODECS[name], out)
+    postings = BlockPostings(bytes(out), 5, count, CODECS[name], 0.0)
+
+    assert list(postings.gaps) == gaps
+    assert list(postings.freqs) == freqs
+    assert list(postings.items()) == list(zip(doc_ids, freqs))
+    assert postings.block_ends() == doc_ids[BLOCK_SIZE - 1::BLOCK_SIZE] + ([doc_ids[-1]] if count % BLOCK_SIZE else [])
+    for i in range(postings.block_count):
+        assert postings.block(i) == (doc_ids[i * BLOCK_SIZE:(i + 1) * BLOCK_SIZE], freqs[i * BLOCK_SIZE:(i + 1) * BLOCK_SIZE])
+
+
+@pytest.mark.parametrize("count", BOUNDARY_COUNTS)
+def test_intersect_matches_set_intersection(count):
+    doc_ids, gaps, freqs = random_postings(count, seed=count + 1)
+    out = bytearray()
+    encode_postings(gaps, freqs, (), CODECS["bitpack"], out)
+    postings = BlockPostings(bytes(out), 0, count, CODECS["bitpack"], 0.0)
+
+    rng = random.Random(count)
+    probes = sorted(set(rng.sample(doc_ids, min(len(doc_ids), 50)) + [0, 1, MAX_UINT32 - 1, MAX_UINT32]
+                        + [doc_id + 1 for doc_id in doc_ids[::17] if doc_id < MAX_UINT32]))
+    assert postings.intersect(probes) == sorted(set(probes) & set(doc_ids))
+    assert postings.intersect([]) == []
+
+
+@pytest.mark.parametrize("name", list(CODECS))
+def test_segment_round_trip(name, collection, tmp_path):
+    index = build_index(collection)
+    index.save(str(tmp_path), codec=name)
+
+    saved = InvertedIndexer.load(str(tmp_path))
+    try:
+        assert sorted(saved.index) == sorted(index.index)
+        for term in index.index:
+            assert saved.postings(term) == index.postings(term)
+            assert saved.max_tf(term) == pytest.approx(index.max_tf(term))
+        assert list(saved.doc_length_array()) == list(index.doc_length_array())
+    finally:
+        saved.segment.close()
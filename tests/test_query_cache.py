@@ -0,0 +1,89 @@
+import pytest
+
+from query_cache import QueryCache, cache_key
+from search_engine import SearchEngine
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+def test_cache_key_normalizes_whitespace_and_option_order():
+    assert cache_key(" binary\t tree ", "bm25", k=10, syntax="keywords") == cache_key("binary tree", "bm25", syntax="keywords", k=10)
+    assert cache_key("binary tree", "bm25", k=10) != cache_key("binary tree", "bm25", k=5)
+    assert cache_key("binary tree", "bm25") != cache_key("binary tree", "tfidf")
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = QueryCache(ttl=10, clock=clock)
+    cache.put("q", 1, ["a"])
+    clock.now = 9.9
+    assert cache.get("q", 1) == ["a"]
+    clock.now = 10.0
+    assert cache.get("q", 1) is None
+    assert len(cache) == 0
+    assert cache.stats()["evictions"] == 1
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = QueryCache(max_entries=2, clock=clock)
+    cache.put("a", 1, "A")
+    cache.put("b", 1, "B")
+    assert cache.get("a", 1) == "A"  # Now "b" is least recently used
+    cache.put("c", 1, "C")
+    assert cache.get("b", 1) is None
+    assert (cache.get("a", 1), cache.get("c", 1)) == ("A", "C")
+    assert cache.stats()["evictions"] == 1
+
+
+def test_a_new_generation_invalidates_entries(clock):
+    cache = QueryCache(clock=clock)
+    cache.put("q", 1, "old")
+    assert cache.get("q", 2) is None
+    assert cache.get("q", 1) is None  # Dropped when looked up against the newer generation
+    assert cache.get_or_compute("q", 2, lambda: "new") == "new"
+    assert cache.get("q", 2) == "new"
+
+
+def test_get_or_compute_computes_once_and_does_not_cache_errors(clock):
+    cache = QueryCache(clock=clock)
+    calls = []
+    assert cache.get_or_compute("q", 1, lambda: calls.append(1) or len(calls)) == 1
+    assert cache.get_or_compute("q", 1, lambda: calls.append(1) or len(calls)) == 1
+    assert len(calls) == 1
+
+    def fail():
+        raise ValueError("bad query")
+
+    with pytest.raises(ValueError):
+        cache.get_or_compute("bad", 1, fail)
+    assert cache.get_or_compute("bad", 1, lambda: []) == []
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 3, 2)
+    assert stats["hit_rate"] == pytest.approx(0.25)
+
+
+def test_engine_shares_entries_between_query_cases(tmp_path, monkeypatch):
+    for category, text in (("stacks", "Stack push pop"), ("queues", "Queue enqueue"), ("trees", "stack of trees")):
+        (tmp_path / "corpus" / category).mkdir(parents=True)
+        (tmp_path / "corpus" / category / "doc.txt").write_text(text)
+    monkeypatch.chdir(tmp_path)  # Indexes are saved under ./index
+    engine = SearchEngine("corpus")
+    try:
+        first = engine.search("bm25", "Stack")
+        second = engine.search("bm25", " stack ")
+        assert first["results"] == second["results"] and len(first["results"]) == 2
+        assert (first["query"], second["query"]) == ("Stack", " stack ")
+        stats = engine.service("ranked").cache.stats()
+        assert (stats["entries"], stats["hits"]) == (1, 1)
+    finally:
+        engine.close()
@@ -0,0 +1,47 @@
+import pytest
+
+from boolean_query import parse_query
+from ranking import apply_boolean_logic, calculate_bm25, calculate_tf_idf
+from sharded_index import open_shards, partition, shard_offsets
+
+
+@pytest.fixture(params=[1, 3])
+def shards(saved_index, request):
+    sharded = open_shards(saved_index, request.param, replicas=2)
+    yield sharded
+    sharded.close()
+
+
+def sample_terms(index):
+    terms = sorted(index.index, key=index.doc_freq, reverse=True)
+    return [terms[:1], terms[:3], terms[5:7] + ["missing"], terms[-2:], ["missing"]]
+
+
+def test_partition_preserves_postings(saved_index):
+    offsets = shard_offsets(len(saved_index.docs), 4)
+    pieces = partition(saved_index, offsets)
+    for term in saved_index.index:
+        merged = [(doc_id + offset, freq) for piece, offset in zip(pieces, offsets) for doc_id, freq in piece.postings(term)]
+        assert merged == saved_index.postings(term)
+    assert sum(piece.docs.live_count() for piece in pieces) == saved_index.docs.live_count()
+
+
+def test_sharded_ranking_equals_unsharded(saved_index, shards):
+    for terms in sample_terms(saved_index):
+        for k in (None, 1, 10):
+            assert shards.tf_idf(terms, k) == calculate_tf_idf(terms, saved_index, k)
+            assert shards.bm25(terms, k) == calculate_bm25(terms, saved_index, k)
+            assert shards.bm25(terms, k, delta=1.0) == calculate_bm25(terms, saved_index, k, delta=1.0)
+
+
+def test_sharded_boolean_equals_unsharded(saved_index, shards):
+    a, b, c = sample_terms(saved_index)[1]
+    for query in (a, f"{a} and {b}", f"{a} or {c}", f"not {a}", f"({a} or {b}) and not {c}", "missing or nothing"):
+        tree = parse_query(query)
+        assert shards.boolean(tree) == apply_boolean_logic(tree, saved_index)
+
+
+def test_shard_errors_propagate(shards):
+    with pytest.raises(KeyError):
+        shards.scatter("no_such_method")
+    assert shards.doc_freqs(["missing"]) == {"missing": (0, 0)}  # The workers still answer afterwards
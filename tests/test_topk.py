@@ -0,0 +1,62 @@
+import random
+
+import pytest
+
+from bm25 import BM25Index
+from ranking import inverse_document_frequencies, tf_idf_scores
+from topk import PostingCursor, wand_top_k
+
+
+def full_sort(scores, k):
+    ranked = sorted(((doc_id, score) for doc_id, score in scores.items() if score > 0), key=lambda item: (-item[1], item[0]))
+    return ranked[:k]
+
+
+def query_samples(index, seed, count=40):
+    rng = random.Random(seed)
+    terms = sorted(index.index)
+    common = terms[:20]
+    return [rng.sample(rng.choice((terms, common)), rng.randint(1, 4)) + rng.choice(([], ["missing"]))
+            for _ in range(count)]
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_wand_cursors_equal_full_sort(seed):
+    # Random postings with exact block maxima, including ties (integer contributions)
+    rng = random.Random(seed)
+    cursors = []
+    scores = {}
+    for _ in range(rng.randint(1, 5)):
+        doc_ids = sorted(rng.sample(range(2000), rng.randint(1, 600)))
+        contributions = [float(rng.randint(1, 9)) for _ in doc_ids]
+        for doc_id, contribution in zip(doc_ids, contributions):
+            scores[doc_id] = scores.get(doc_id, 0) + contribution
+        size = rng.choice((4, 16, 128))
+        ends = doc_ids[size - 1::size] + ([doc_ids[-1]] if len(doc_ids) % size else [])
+        bounds = [max(contributions[i:i + size]) for i in range(0, len(doc_ids), size)]
+        blocks = (ends, bounds) if rng.random() < 0.7 else None
+        cursors.append((doc_ids, contributions, blocks))
+
+    for k in (1, 2, 10, 100, 5000):
+        wand = wand_top_k([PostingCursor(doc_ids, contributions.__getitem__, max(contributions), blocks)
+                           for doc_ids, contributions, blocks in cursors], k)
+        assert wand == full_sort(scores, k)
+
+
+def test_tf_idf_top_k_equals_full_sort(saved_index):
+    for terms in query_samples(saved_index, seed=1):
+        idf = inverse_document_frequencies(terms, saved_index.docs.live_count(), saved_index.doc_freq)
+        ranked = tf_idf_scores(terms, saved_index, idf)
+        for k in (1, 3, 10, 1000):
+            assert tf_idf_scores(terms, saved_index, idf, k) == ranked[:k]
+
+
+@pytest.mark.parametrize("delta", [0.0, 1.0])
+def test_bm25_top_k_equals_full_sort(saved_index, delta):
+    bm25 = BM25Index(saved_index, delta=delta)
+    for terms in query_samples(saved_index, seed=2):
+        scores = bm25.scores(terms)
+        live = {doc_id: float(scores[doc_id]) for doc_id in range(len(saved_index.docs))
+                if doc_id not in saved_index.docs.deleted}
+        for k in (1, 3, 10, 1000):
+            assert bm25.top_k(terms, k) == full_sort(live, k)
@@ -0,0 +1,144 @@
+import heapq
+from bisect import bisect_left
+
+# Upper bounds are sums of floats added in a different order than the exact score; allow for rounding
+BOUND_SLACK = 1e-9
+
+
+# Cursor over one query term's sorted doc IDs
+class PostingCursor:
+    def __init__(self, doc_ids, contribution, upper_bound, blocks=None):
+        self.doc_ids = doc_ids
+        self.contribution = contribution  # posting position -> score contribution
+        self.upper_bound = upper_bound  # no posting contributes more than this
+        self.blocks = blocks  # optional (last doc IDs, upper bounds) of the postings' blocks
+        self.pos = 0
+
+    @property
+    def doc(self):
+        return self.doc_ids[self.pos] if self.pos < len(self.doc_ids) else None
+
+    def score(self):
+        return self.contribution(self.pos)
+
+    def advance(self, target):
+        """
+        Move to the first posting with doc ID >= target.
+        """
+        self.pos = bisect_left(self.doc_ids, target, self.pos)
+
+    def block_bound(self, target):
+        """
+        Return (upper bound on the contribution of doc ID target, last doc ID the bound covers or None).
+        """
+        if self.blocks is None:
+            return self.upper_bound, None
+        ends, bounds = self.blocks
+        i = bisect_left(ends, target)
+        if i == len(ends):
+            return 0, None
+        return bounds[i], ends[i]
+
+
+def block_max(active, pivot_doc):
+    """
+    Return (upper bound on the score of any doc from pivot_doc up to the returned doc ID, exclusive).
+
+    Only cursors at or before pivot_doc can match those docs, and each contributes at most its
+    bound for the block holding pivot_doc until that block ends.
+    """
+    bound = 0
+    end = None
+    for cursor in active:
+        if cursor.doc > pivot_doc:
+            end = cursor.doc if end is None else min(end, cursor.doc)  # The next cursor joins here
+            break
+        block_bound, block_end = cursor.block_bound(pivot_doc)
+        bound += block_bound
+        if block_end is not None:
+            end = block_end + 1 if end is None else min(end, block_end + 1)
+    return bound, end if end is not None else pivot_doc + 1
+
+
+def wand_top_k(cursors, k):
+    """
+    Return the k best (doc ID, score) pairs using WAND pivoting.
+
+    Documents whose summed term upper bounds cannot beat the current k-th score are
+    skipped without being scored; cursors with block bounds (block-max WAND) also skip
+    whole blocks whose bounds cannot. Scores are summed in cursor order, and ties keep
+    the lower doc ID, so the result equals a full sort truncated to k.
+    """
+    heap = []  # (score, -doc ID); the root is the result that is evicted first
+    threshold = 0
+    active = [cursor for cursor in cursors if cursor.doc is not None]
+
+    while active and k > 0:
+        active.sort(key=lambda cursor: cursor.doc)
+
+        # Pivot: first cursor at which the accumulated upper bound can beat the threshold
+        bound = 0
+        pivot = None
+        for i, cursor in enumerate(active):
+            bound += cursor.upper_bound
+            if bound * (1 + BOUND_SLACK) > threshold:
+                pivot = i
+                break
+        if pivot is None:
+            break
+
+        pivot_doc = active[pivot].doc
+        bound, end = block_max(active, pivot_doc)
+        if bound * (1 + BOUND_SLACK) <= threshold:
+            # Nothing before end can beat the threshold within the current blocks
+            for cursor in active:
+                if cursor.doc < end:
+                    cursor.advance(end)
+        elif active[0].doc == pivot_doc:
+            score = sum(cursor.score() for cursor in cursors if cursor.doc == pivot_doc)
+            if score > threshold:
+                if len(heap) < k:
+                    heapq.heappush(heap, (score, -pivot_doc))
+                else:
+                    heapq.heapreplace(heap, (score, -pivot_doc))
+                if len(heap) == k:
+                    threshold = heap[0][0]
+            for cursor in active:
+                if cursor.doc == pivot_doc:
+                    cursor.advance(pivot_doc + 1)
+        else:
+            # Skip the lagging cursors straight to the pivot document
+            for cursor in active[:pivot]:
+                cursor.advance(pivot_doc)
+
+        active = [cursor for cursor in active if cursor.doc is not None]
+
+    return [(-neg_doc, score) for score, neg_doc in sorted(heap, key=lambda item: (-item[0], -item[1]))]
+
+
+def top_k_by_key(items, k, key):
+    """
+    Bounded-heap equivalent of sorted(items, key=key, reverse=True)[:k].
+    """
+    return heapq.nlargest(k, items, key=key)
+
+
+def tf_cursor(index, term, weight, surface=False):
+    """
+    Cursor scoring each of a term's postings as (freq / doc length) * weight, with the
+    per-block bounds of saved postings. surface=True scores surface-form counts, which never
+    exceed the frequencies, so the bounds still hold.
+    """
+    postings = index.surface_postings(term) if surface else index.postings(term)
+    doc_ids = [doc_id for doc_id, _ in postings]
+    freqs = [freq for _, freq in postings]
+
+    def contribution(pos):
+        doc_length = index.doc_length(doc_ids[pos])
+        return (freqs[pos] / doc_length if doc_length else 0) * weight
+
+    blocks = index.block_bounds(term)
+    if blocks is not None:
+        ends, max_tfs = blocks
+        blocks = ends, [max_tf * weight for max_tf in max_tfs]
+    return PostingCursor(doc_ids, contribution, index.max_tf(term) * weight, blocks)
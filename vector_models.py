@@ -0,0 +1,58 @@
+from collections import Counter
+
+from analysis import term_analyzer
+from ranking import get_score
+from weighted_index import normalize_query
+
+
+# Helper pairing the index's doc IDs with their scores, best first (deleted documents are dropped)
+def paths_by_score(doc_ids, scores, index):
+    docs = index.indexer.docs
+    results = [(docs.path(int(doc_id)), float(score)) for doc_id, score in zip(doc_ids, scores)
+               if int(doc_id) not in docs.deleted]
+    return sorted(results, key=get_score, reverse=True)
+
+
+# Function to process Boolean Extended model
+def process_boolean_extended_query(query, index, p=2.0):
+    """
+    Process a Boolean Extended query with p-norm scoring: +terms are AND'ed (a soft AND, so documents
+    missing one still score, lower), -term excluded, other terms OR'ed.
+    """
+    required = normalize_query(" ".join(term[1:] for term in query.split() if term.startswith("+")))
+    excluded = normalize_query(" ".join(term[1:] for term in query.split() if term.startswith("-")))
+    optional = normalize_query(" ".join(term for term in query.split() if term[0] not in "+-"))
+    doc_ids, scores = index.pnorm_scores(required, optional, excluded, p)
+    return paths_by_score(doc_ids, scores, index)
+
+
+# Function to process Fuzzy model
+def process_fuzzy_query(query, index):
+    """
+    Process a Fuzzy query: a document's membership is the share of query terms in its postings.
+    """
+    doc_ids, memberships = index.fuzzy_scores(normalize_query(query))
+    return paths_by_score(doc_ids, memberships, index)
+
+
+# Function to process Generalized Vector model
+def process_generalized_vector_query(query, index):
+    """
+    Process a Generalized Vector query: query and document vectors are binary, so a document scores
+    the number of distinct query terms it contains. Scored from the postings of an index built
+    with term_analyzer, so no document is read.
+    """
+    similarities = Counter()
+    for term in dict.fromkeys(term_analyzer.terms(query)):
+        similarities.update(index.doc_ids(term))
+    results = [(index.docs.path(doc_id), similarity) for doc_id, similarity in sorted(similarities.items())]
+    return sorted(results, key=get_score, reverse=True)
+
+
+# Function to process Latent Semantic Indexing (LSI) model
+def process_lsi_query(query, model):
+    """
+    Process an LSI query: fold the query into the latent space and rank documents by cosine similarity.
+    """
+    results = [(path, float(score)) for path, score in zip(model.paths, model.similarities(query))]
+    return sorted(results, key=get_score, reverse=True)
@@ -0,0 +1,98 @@
+import math
+import numpy as np
+
+from analysis import term_analyzer
+
+
+# Query terms analyzed as the term index analyzes documents
+def normalize_query(query):
+    return term_analyzer.terms(query)
+
+
+# Normalized term weights in [0, 1] over an InvertedIndexer, for the p-norm and fuzzy models
+class WeightedIndex:
+    def __init__(self, indexer):
+        """
+        The weight of a term in a document is (freq / largest freq in the document) * idf / largest idf,
+        with idf = log(1 + N / doc freq), so every weight lies in [0, 1].
+        """
+        self.indexer = indexer
+        self.num_live_docs = indexer.docs.live_count()
+        self.max_idf = math.log(1 + self.num_live_docs) if self.num_live_docs else 1.0
+        self._postings = {}  # term -> (doc IDs, weights), decoded once
+
+        # Largest term frequency per document, from one pass over the postings
+        self.max_freqs = np.zeros(len(indexer.docs))
+        for term in indexer.index:
+            doc_ids, freqs = self._decode(term)
+            np.maximum.at(self.max_freqs, doc_ids, freqs)
+
+    def _decode(self, term):
+        pairs = self.indexer.postings(term)
+        doc_ids = np.fromiter((doc_id for doc_id, _ in pairs), dtype=np.int64, count=len(pairs))
+        freqs = np.fromiter((freq for _, freq in pairs), dtype=np.float64, count=len(pairs))
+        return doc_ids, freqs
+
+    def term_postings(self, term):
+        postings = self._postings.get(term)
+        if postings is None:
+            doc_ids, freqs = self._decode(term)
+            idf = math.log(1 + self.num_live_docs / len(doc_ids)) / self.max_idf if len(doc_ids) else 0.0
+            postings = self._postings[term] = (doc_ids, freqs / self.max_freqs[doc_ids] * idf)
+        return postings
+
+    def term_weights(self, terms):
+        """
+        Return (candidate doc IDs, weight matrix of shape terms x candidates) over the union of the terms' postings.
+        """
+        postings = [self.term_postings(term) for term in terms]
+        candidates = np.unique(np.concatenate([doc_ids for doc_ids, _ in postings] or [np.zeros(0, dtype=np.int64)]))
+        weights = np.zeros((len(terms), len(candidates)))
+        for row, (doc_ids, term_weights) in enumerate(postings):
+            weights[row, np.searchsorted(candidates, doc_ids)] = term_weights
+        return candidates, weights
+
+    def pnorm_scores(self, required, optional, excluded=(), p=2.0):
+        """
+        Extended Boolean (p-norm) scores: required terms are AND'ed, optional terms OR'ed and the
+        OR group joins the AND as one operand. The AND is soft, so a document missing a required
+        term scores lower but is not dropped; documents containing an excluded term are.
+        Returns (doc IDs, scores) for documents scoring above zero.
+        """
+        if not required and not optional:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        candidates, weights = self.term_weights(list(required) + list(optional))
+        operands = list(weights[:len(required)])
+        if optional:
+            operands.append(pnorm_or(weights[len(required):], p))
+        scores = pnorm_and(np.array(operands), p)
+
+        keep = scores > 0
+        for term in excluded:
+            keep &= ~np.isin(candidates, self.term_postings(term)[0])
+        return candidates[keep], scores[keep]
+
+    def fuzzy_scores(self, terms):
+        """
+        Fuzzy membership of each document in the query: the share of query terms it contains.
+        Returns (doc IDs, memberships) for documents containing at least one query term.
+        """
+        if not terms:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        doc_ids = np.concatenate([self.term_postings(term)[0] for term in terms])
+        counts = np.bincount(doc_ids, minlength=len(self.indexer.docs))
+        matched = np.flatnonzero(counts)
+        return matched, counts[matched] / len(terms)
+
+
+# p-norm operators over a matrix of operand weights (operands x documents). Weights are scaled by
+# their per-document maximum before the power, so a large p tends to max (OR) and min (AND)
+# instead of underflowing to 0.
+def pnorm_or(weights, p):
+    largest = weights.max(axis=0)
+    scale = np.where(largest > 0, largest, 1.0)
+    return largest * (np.power(weights / scale, p).sum(axis=0) / len(weights)) ** (1 / p)
+
+
+def pnorm_and(weights, p):
+    return 1 - pnorm_or(1 - weights, p)